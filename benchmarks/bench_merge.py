@@ -0,0 +1,112 @@
+"""
+Benchmark de latencia de MERGE sobre la clave de `ventas` (letra, tipo, sucursal, numero)
+a medida que crece la tabla, con y sin el índice único UX_ventas_clave.
+
+Usa una tabla temporal propia (`bench_ventas`) en la base configurada en .env (SQL_SERVER, SQL_DATABASE, ...),
+no toca las tablas reales. Requiere un SQL Server accesible.
+
+    python -m benchmarks.bench_merge --tamanios 1000,10000,100000,500000 --merges 200
+"""
+import argparse
+import random
+import statistics
+import time
+
+try:
+    from src.connection import get_connection
+except ImportError or ModuleNotFoundError:
+    from connection import get_connection
+
+
+TABLA = "bench_ventas"
+CLAVES = ["letra", "tipo", "sucursal", "numero"]
+COLUMNAS = CLAVES + ["fechaHora", "importeTotal", "descripcion"]
+
+
+def fila(numero: int) -> tuple:
+    return ("A", "FC", numero % 10, numero, "2025-10-02T10:00:00", round(random.uniform(100, 50000), 2), "x" * 80)
+
+
+def crear_tabla(cursor, con_indice: bool):
+    cursor.execute(f"IF OBJECT_ID('{TABLA}', 'U') IS NOT NULL DROP TABLE {TABLA}")
+    cursor.execute(f"""
+    CREATE TABLE {TABLA} (
+        id INT IDENTITY(1,1) PRIMARY KEY,
+        letra NVARCHAR(5) NOT NULL,
+        tipo NVARCHAR(10) NOT NULL,
+        sucursal INT NOT NULL,
+        numero BIGINT NOT NULL,
+        fechaHora DATETIME2 NULL,
+        importeTotal DECIMAL(18,4) NULL,
+        descripcion NVARCHAR(200) NULL
+    )""")
+    if con_indice:
+        cursor.execute(f"CREATE UNIQUE NONCLUSTERED INDEX UX_{TABLA}_clave ON {TABLA} ({', '.join(CLAVES)})")
+
+
+def llenar_hasta(conexion, cursor, actual: int, objetivo: int):
+    """Inserta filas nuevas hasta llegar a `objetivo` filas."""
+    cursor.fast_executemany = True
+    query = f"INSERT INTO {TABLA} ({', '.join(COLUMNAS)}) VALUES ({', '.join('?' for _ in COLUMNAS)})"
+    for inicio in range(actual, objetivo, 10000):
+        cursor.executemany(query, [fila(n) for n in range(inicio, min(inicio + 10000, objetivo))])
+        conexion.commit()
+    cursor.fast_executemany = False
+
+
+def medir_merges(conexion, cursor, tamanio: int, cantidad: int) -> list[float]:
+    """Mismo MERGE de una fila que `insertar.ventas`, mitad sobre claves existentes y mitad nuevas."""
+    on_clause = ' AND '.join([f"target.{col} = source.{col}" for col in CLAVES])
+    update_set = ', '.join([f"target.{col} = source.{col}" for col in COLUMNAS if col not in CLAVES])
+    query = f"""
+    MERGE {TABLA} AS target
+    USING (SELECT {', '.join([f'? AS {col}' for col in COLUMNAS])}) AS source
+    ON {on_clause}
+    WHEN MATCHED THEN
+        UPDATE SET {update_set}
+    WHEN NOT MATCHED THEN
+        INSERT ({', '.join(COLUMNAS)})
+        VALUES ({', '.join([f"source.{col}" for col in COLUMNAS])})
+    OUTPUT INSERTED.id;
+    """
+    tiempos = []
+    for i in range(cantidad):
+        numero = random.randrange(tamanio) if i % 2 == 0 else tamanio * 10 + i
+        inicio = time.perf_counter()
+        cursor.execute(query, fila(numero))
+        cursor.fetchone()
+        tiempos.append((time.perf_counter() - inicio) * 1000)
+    # No dejamos las filas nuevas para no alterar el tamaño del siguiente paso
+    conexion.rollback()
+    return tiempos
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tamanios", default="1000,10000,100000", help="Tamaños de tabla separados por coma")
+    parser.add_argument("--merges", type=int, default=200, help="MERGE medidos por tamaño")
+    args = parser.parse_args()
+    tamanios = sorted(int(t) for t in args.tamanios.split(","))
+
+    conexion = get_connection()
+    cursor = conexion.cursor()
+    print(f"{'índice':<8}{'filas':>10}{'media ms':>12}{'p50 ms':>10}{'p95 ms':>10}")
+    try:
+        for con_indice in (False, True):
+            crear_tabla(cursor, con_indice)
+            conexion.commit()
+            actual = 0
+            for tamanio in tamanios:
+                llenar_hasta(conexion, cursor, actual, tamanio)
+                actual = tamanio
+                tiempos = sorted(medir_merges(conexion, cursor, tamanio, args.merges))
+                print(f"{'sí' if con_indice else 'no':<8}{tamanio:>10}{statistics.mean(tiempos):>12.2f}"
+                      f"{tiempos[len(tiempos) // 2]:>10.2f}{tiempos[int(len(tiempos) * 0.95)]:>10.2f}")
+    finally:
+        cursor.execute(f"IF OBJECT_ID('{TABLA}', 'U') IS NOT NULL DROP TABLE {TABLA}")
+        conexion.commit()
+        conexion.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,211 @@
+"""
+Benchmark de `src.worker` con varios procesos: reparte N ventanas simuladas entre 1, 2, 4, ... procesos
+worker y muestra el tiempo total y el speedup respecto de un solo proceso. También verifica que ninguna
+ventana se haya procesado dos veces.
+
+Cada ventana simula el tiempo de espera de la API y la base con un sleep de `--ms` milisegundos, que es
+donde se va el tiempo de un job real. Hay dos backends de cola:
+
+- `sql` (por defecto si hay `SQL_SERVER` configurado): usa `ColaSQL` contra SQL Server, sobre una tabla propia
+  del benchmark (`trabajos_cola_bench`, se recrea en cada corrida), así se prueban el reclamo con
+  READPAST (intercalando tenants), la renovación y el vencimiento de leases reales. Antes de arrancar, un worker "muerto"
+  reclama una ventana con un lease de 1 segundo y nunca la renueva: se verifica que otro worker la reclame
+  y la complete una sola vez. Con `--lease` menor que `--ms` cada ventana depende de la renovación del lease.
+- `memoria`: una cola en memoria compartida entre procesos (multiprocessing.Manager) con la misma interfaz
+  y semántica de leases que `ColaSQL`. No necesita base, pero no prueba el SQL de la cola.
+
+    python -m benchmarks.bench_workers --ventanas 200 --ms 50 --procesos 1,2,4,8
+    python -m benchmarks.bench_workers --backend sql --ventanas 50 --ms 3000 --lease 3 --procesos 4
+"""
+import argparse
+import multiprocessing
+import os
+import threading
+import time
+from collections import Counter
+from multiprocessing.managers import BaseManager
+
+try:
+    from src.cola import ColaSQL
+    from src.worker import ejecutar_worker
+except ImportError or ModuleNotFoundError:
+    from cola import ColaSQL
+    from worker import ejecutar_worker
+
+
+TABLA_BENCH = "trabajos_cola_bench"
+
+
+class ColaMemoria:
+    """Cola con leases en memoria. Vive en el proceso del Manager; los workers la usan por proxy."""
+
+    def __init__(self, ventanas: int):
+        self._lock = threading.Lock()
+        self._items = {
+            i: {"id": i, "job_id": "bench", "tenant": "bench", "tabla": "ventas", "estado": "pendiente",
+                "worker": None, "lease_hasta": 0.0, "intentos": 0}
+            for i in range(ventanas)
+        }
+        self._procesados: dict[int, int] = {}
+
+    def reclamar(self, worker: str, lease_segundos: int):
+        with self._lock:
+            ahora = time.monotonic()
+            for item in self._items.values():
+                vencido = item["estado"] == "en_curso" and item["lease_hasta"] < ahora
+                if item["estado"] == "pendiente" or vencido:
+                    item.update(estado="en_curso", worker=worker, lease_hasta=ahora + lease_segundos, intentos=item["intentos"] + 1)
+                    return dict(item)
+            return None
+
+    def renovar(self, id: int, worker: str, lease_segundos: int) -> bool:
+        with self._lock:
+            item = self._items[id]
+            if item["worker"] != worker or item["estado"] != "en_curso":
+                return False
+            item["lease_hasta"] = time.monotonic() + lease_segundos
+            return True
+
+    def completar(self, id: int, worker: str):
+        with self._lock:
+            item = self._items[id]
+            if item["worker"] == worker and item["estado"] == "en_curso":
+                item["estado"] = "ok"
+                self._procesados[id] = self._procesados.get(id, 0) + 1
+
+    def fallar(self, id: int, worker: str, error: str):
+        with self._lock:
+            item = self._items[id]
+            if item["worker"] == worker and item["estado"] == "en_curso":
+                item["estado"] = "pendiente"
+
+    def terminado(self) -> bool:
+        with self._lock:
+            return all(item["estado"] == "ok" for item in self._items.values())
+
+    def procesados(self) -> dict[int, int]:
+        with self._lock:
+            return dict(self._procesados)
+
+
+class ManagerBench(BaseManager):
+    pass
+
+
+ManagerBench.register("ColaMemoria", ColaMemoria)
+
+
+def procesar_simulado(ms: float):
+    def procesar(item: dict, cancelado: threading.Event):
+        time.sleep(ms / 1000)
+    return procesar
+
+
+def proceso_worker(cola, nombre: str, ms: float):
+    detener = threading.Event()
+    hilo = threading.Thread(target=ejecutar_worker, args=(cola, procesar_simulado(ms), nombre, detener, 30, 0.01))
+    hilo.start()
+    while not cola.terminado():
+        time.sleep(0.02)
+    detener.set()
+    hilo.join()
+
+
+def correr(procesos: int, ventanas: int, ms: float) -> tuple[float, dict[int, int]]:
+    with ManagerBench() as manager:
+        cola = manager.ColaMemoria(ventanas)  # type: ignore
+        workers = [multiprocessing.Process(target=proceso_worker, args=(cola, f"bench-{i}", ms)) for i in range(procesos)]
+        inicio = time.perf_counter()
+        for w in workers:
+            w.start()
+        for w in workers:
+            w.join()
+        return time.perf_counter() - inicio, cola.procesados()
+
+
+def proceso_worker_sql(nombre: str, ms: float, job_id: str, lease: int, resultados):
+    """Worker con su propia `ColaSQL` (las conexiones no se comparten entre procesos). Informa las ventanas que terminó."""
+    cola = ColaSQL(tamanio_pool=3, tabla=TABLA_BENCH)
+    terminadas: list[int] = []
+
+    def procesar(item: dict, cancelado: threading.Event):
+        time.sleep(ms / 1000)
+        if not cancelado.is_set():
+            terminadas.append(item["id"])
+
+    detener = threading.Event()
+    hilo = threading.Thread(target=ejecutar_worker, args=(cola, procesar, nombre, detener, lease, 0.05))
+    hilo.start()
+    while cola.estado_job(job_id)["estado"] not in ("ok", "error"):  # type: ignore
+        time.sleep(0.2)
+    detener.set()
+    hilo.join()
+    cola.pool.cerrar()
+    resultados.put(terminadas)
+
+
+def _ejecutar(cola: ColaSQL, query: str, params: tuple = ()):
+    with cola.pool.conexion() as conexion:
+        cursor = conexion.cursor()
+        cursor.execute(query, params)
+        fila = cursor.fetchone() if cursor.description else None
+        conexion.commit()
+    return fila
+
+
+def correr_sql(procesos: int, ventanas: int, ms: float, lease: int) -> tuple[float, dict[int, int]]:
+    cola = ColaSQL(tabla=TABLA_BENCH)
+    _ejecutar(cola, f"IF OBJECT_ID('{TABLA_BENCH}', 'U') IS NOT NULL DROP TABLE {TABLA_BENCH}")
+    cola.preparar()
+    job_id = cola.encolar("bench", "ventas", [(str(i), str(i)) for i in range(ventanas)])
+
+    # Un worker que reclama una ventana y muere: su lease vence y la tiene que reclamar otro
+    muerta = cola.reclamar("bench-muerto", 1)
+
+    resultados = multiprocessing.Queue()
+    workers = [multiprocessing.Process(target=proceso_worker_sql, args=(f"bench-{i}", ms, job_id, lease, resultados)) for i in range(procesos)]
+    inicio = time.perf_counter()
+    for w in workers:
+        w.start()
+    terminadas = [id for _ in workers for id in resultados.get()]
+    for w in workers:
+        w.join()
+    segundos = time.perf_counter() - inicio
+
+    estado, intentos, worker = _ejecutar(cola, f"SELECT estado, intentos, worker FROM {TABLA_BENCH} WHERE id = ?", (muerta["id"],))  # type: ignore
+    if estado != "ok" or intentos != 2 or worker == "bench-muerto":
+        raise SystemExit(f"La ventana con lease vencido no se reclamó bien: estado={estado}, intentos={intentos}, worker={worker}")
+    pendientes = _ejecutar(cola, f"SELECT COUNT(*) FROM {TABLA_BENCH} WHERE estado <> 'ok'")[0]  # type: ignore
+    if pendientes:
+        raise SystemExit(f"{pendientes} ventanas no quedaron en estado ok")
+    _ejecutar(cola, f"DROP TABLE {TABLA_BENCH}")
+    cola.pool.cerrar()
+    return segundos, dict(Counter(terminadas))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--backend", choices=["sql", "memoria"], default="sql" if os.environ.get("SQL_SERVER") else "memoria")
+    parser.add_argument("--ventanas", type=int, default=200)
+    parser.add_argument("--ms", type=float, default=50, help="Duración simulada de cada ventana")
+    parser.add_argument("--procesos", default="1,2,4,8")
+    parser.add_argument("--lease", type=int, default=30, help="Segundos de lease (solo backend sql)")
+    args = parser.parse_args()
+
+    base = None
+    print(f"backend: {args.backend}")
+    print(f"{'procesos':>9}{'segundos':>10}{'ventanas/s':>12}{'speedup':>9}{'eficiencia':>12}")
+    for procesos in [int(p) for p in args.procesos.split(",")]:
+        if args.backend == "sql":
+            segundos, procesados = correr_sql(procesos, args.ventanas, args.ms, args.lease)
+        else:
+            segundos, procesados = correr(procesos, args.ventanas, args.ms)
+        if len(procesados) != args.ventanas or any(n != 1 for n in procesados.values()):
+            raise SystemExit(f"Ventanas procesadas incorrectamente con {procesos} procesos: {procesados}")
+        base = base or segundos
+        speedup = base / segundos
+        print(f"{procesos:>9}{segundos:>10.2f}{args.ventanas / segundos:>12.1f}{speedup:>9.2f}{speedup / procesos:>12.0%}")
+
+
+if __name__ == "__main__":
+    main()
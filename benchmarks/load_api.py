@@ -0,0 +1,235 @@
+"""
+Prueba de carga HTTP de la API: dispara jobs de `/jobs/ventas/{idTurno}` y `/jobs/descargas` en paralelo
+mientras se consulta `/health`, y reporta p50/p99 de latencia de cada endpoint y el lag del event loop.
+
+Corre la app en proceso (httpx + ASGITransport) contra una API de DEBO simulada (una sesión HTTP falsa
+que demora `--api-ms` por request) y un cursor de base falso (que demora `--db-ms` por sentencia), así
+no necesita red, credenciales ni SQL Server. Si un handler bloquea el event loop, `/health` y el lag lo
+muestran enseguida: la prueba sale con código 1 si se supera algún umbral.
+
+    python -m benchmarks.load_api --duracion 10 --jobs 4 --health 4
+"""
+import argparse
+import asyncio
+import logging
+import os
+import random
+import statistics
+import sys
+import time
+
+os.environ.setdefault("TOKEN_AUTH", "load-test")
+os.environ["ESQUEMA_VERIFICAR"] = "false"
+os.environ["PROFILE_SAMPLE_RATE"] = "0"
+os.environ["MODO_COLA"] = "false"
+
+import httpx
+
+try:
+    import src.api_client as api_client_mod
+    import src.main as main_mod
+except ImportError or ModuleNotFoundError:
+    import api_client as api_client_mod
+    import main as main_mod
+
+
+TOKEN = os.environ["TOKEN_AUTH"]
+
+
+class RespuestaFalsa:
+    def __init__(self, datos):
+        self._datos = datos
+        self.status_code = 200
+
+    def json(self):
+        return self._datos
+
+
+class SesionDeboFalsa:
+    """Reemplaza la sesión HTTP de `ClienteDebo`: demora `api_ms` (bloqueante, como requests) y devuelve datos generados."""
+
+    def __init__(self, api_ms: float, ventas: int):
+        self.api_ms = api_ms
+        self.ventas = ventas
+
+    def request(self, metodo: str, url: str, **kwargs):
+        time.sleep(self.api_ms / 1000)
+        if url.endswith("token"):
+            return RespuestaFalsa({"token": "token-falso"})
+        if url.endswith("ventas-fechas"):
+            return RespuestaFalsa([venta_falsa(n) for n in range(self.ventas)])
+        if url.endswith("compras-fechas"):
+            return RespuestaFalsa([remito_falso(n) for n in range(max(1, self.ventas // 10))])
+        return RespuestaFalsa([])
+
+
+def venta_falsa(numero: int) -> dict:
+    return {
+        "letra": "B", "tipo": "FC", "sucursal": 1, "numero": numero, "fechaHora": "2025-10-02T10:00:00",
+        "importeTotal": round(random.uniform(1000, 50000), 2), "idTurno": 1,
+        "cliente": {"id": numero % 50, "razon_social": "Cliente"}, "Vendedor": {"Id": 1, "nombre": "Vendedor"},
+        "lugarDeVenta": {"Id": 1, "descripcion": "Playa"}, "formaDePago": {"id": 1, "descripcion": "Contado", "detalle": []},
+        "Cuerpo": [{"item": 1, "idArticulo": 10, "cantidad": 30.5, "precioVentaCobrado": 1000.0}],
+    }
+
+
+def remito_falso(numero: int) -> dict:
+    return {
+        "letra": "R", "tipo": "RM", "sucursal": 1, "numero": numero, "fechaComprobante": "2025-10-02T08:00:00",
+        "proveedor": {"razon_social": "Proveedor", "cuit": "30-00000000-0"}, "Vendedor": {"Id": 1, "nombre": "Vendedor"},
+        "Cuerpo": [{"item": 1, "idTanque": 1, "cantidad": 10000, "importeCompra": 1500000.0}],
+    }
+
+
+class CursorFalso:
+    """Cursor de base falso: cada sentencia demora `db_ms` (bloqueante, como pyodbc)."""
+
+    def __init__(self, db_ms: float):
+        self.db_ms = db_ms
+        self.rowcount = 1
+
+    def execute(self, query, *params):
+        time.sleep(self.db_ms / 1000)
+        return self
+
+    def executemany(self, query, filas):
+        time.sleep(self.db_ms / 1000)
+
+    def fetchone(self):
+        return (1,)
+
+    def fetchall(self):
+        return []
+
+    def close(self):
+        pass
+
+
+class ConexionFalsa:
+    def __init__(self, db_ms: float):
+        self.db_ms = db_ms
+
+    def cursor(self):
+        return CursorFalso(self.db_ms)
+
+    def commit(self):
+        time.sleep(self.db_ms / 1000)
+
+    def rollback(self):
+        pass
+
+    def close(self):
+        pass
+
+
+def percentil(valores: list[float], p: float) -> float:
+    if not valores:
+        return 0.0
+    ordenados = sorted(valores)
+    return ordenados[min(len(ordenados) - 1, int(len(ordenados) * p / 100))]
+
+
+async def medir_lag(fin: float, lags: list[float], intervalo: float = 0.01):
+    """Cuánto más de lo pedido tarda en volver un `asyncio.sleep(intervalo)`: mide si algo bloquea el loop."""
+    loop = asyncio.get_running_loop()
+    while loop.time() < fin:
+        inicio = loop.time()
+        await asyncio.sleep(intervalo)
+        lags.append((loop.time() - inicio - intervalo) * 1000)
+
+
+async def sondear(cliente: httpx.AsyncClient, url: str, metodo: str, fin: float, latencias: list[float], errores: list[str], pausa: float):
+    """
+    Envía requests en secuencia. Con `pausa` > 0 sigue un calendario fijo (una cada `pausa` segundos) y mide
+    la latencia desde el momento programado, así una demora del event loop para enviar también cuenta.
+    """
+    loop = asyncio.get_running_loop()
+    programado = loop.time()
+    while loop.time() < fin:
+        if pausa:
+            await asyncio.sleep(max(0.0, programado - loop.time()))
+            inicio = programado
+            programado += pausa
+        else:
+            inicio = loop.time()
+        try:
+            respuesta = await cliente.request(metodo, url)
+            if respuesta.status_code != 200:
+                errores.append(f"{url}: HTTP {respuesta.status_code}")
+        except Exception as e:
+            errores.append(f"{url}: {e}")
+        latencias.append((loop.time() - inicio) * 1000)
+
+
+async def correr(args) -> dict:
+    transporte = httpx.ASGITransport(app=main_mod.app)
+    resultados: dict[str, list[float]] = {"health": [], "jobs/ventas": [], "jobs/descargas": [], "lag": []}
+    errores: list[str] = []
+
+    async with httpx.AsyncClient(transport=transporte, base_url="http://api", timeout=None) as cliente:
+        fin = asyncio.get_running_loop().time() + args.duracion
+        tareas = [medir_lag(fin, resultados["lag"])]
+        for _ in range(args.health):
+            tareas.append(sondear(cliente, f"/health?token={TOKEN}", "GET", fin, resultados["health"], errores, args.pausa_health / 1000))
+        for i in range(args.jobs):
+            if i % 2 == 0:
+                url, clave = f"/jobs/ventas/1?token={TOKEN}&fecha_desde=021020250600&fecha_hasta=021020251400", "jobs/ventas"
+            else:
+                url, clave = f"/jobs/descargas?token={TOKEN}&fecha_desde=021020250000&fecha_hasta=021020250000", "jobs/descargas"
+            tareas.append(sondear(cliente, url, "POST", fin, resultados[clave], errores, 0))
+        await asyncio.gather(*tareas)
+
+    return {"resultados": resultados, "errores": errores}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--duracion", type=float, default=10, help="Segundos de carga")
+    parser.add_argument("--jobs", type=int, default=4, help="Clientes disparando jobs en paralelo (alternando ventas y descargas)")
+    parser.add_argument("--health", type=int, default=4, help="Clientes consultando /health en paralelo")
+    parser.add_argument("--pausa-health", type=float, default=50, help="ms entre consultas de cada cliente de /health")
+    parser.add_argument("--ventas", type=int, default=100, help="Ventas por respuesta de la API simulada")
+    parser.add_argument("--api-ms", type=float, default=200, help="Latencia simulada de cada request a DEBO")
+    parser.add_argument("--db-ms", type=float, default=1, help="Latencia simulada de cada sentencia SQL")
+    parser.add_argument("--pausa-descargas", type=float, default=0.2, help="Segundos de pausa entre días de descargas")
+    parser.add_argument("--max-health-p99", type=float, default=100, help="Umbral de p99 de /health en ms")
+    parser.add_argument("--max-lag-p99", type=float, default=50, help="Umbral de p99 del lag del event loop en ms")
+    parser.add_argument("--max-job-p99", type=float, default=None, help="Umbral opcional de p99 de los jobs en ms")
+    args = parser.parse_args()
+
+    logging.disable(logging.WARNING)
+    sesion = SesionDeboFalsa(args.api_ms, args.ventas)
+    api_client_mod._cliente_por_defecto = lambda: api_client_mod.ClienteDebo("http://debo-falso/", "load-test", session=sesion)
+    main_mod.get_connection = lambda config=None: ConexionFalsa(args.db_ms)
+    main_mod.PAUSA_DESCARGAS = args.pausa_descargas
+
+    salida = asyncio.run(correr(args))
+    resultados, errores = salida["resultados"], salida["errores"]
+
+    print(f"{'métrica':<16}{'n':>7}{'p50 ms':>10}{'p99 ms':>10}{'max ms':>10}")
+    for nombre, valores in resultados.items():
+        if valores:
+            print(f"{nombre:<16}{len(valores):>7}{statistics.median(valores):>10.1f}{percentil(valores, 99):>10.1f}{max(valores):>10.1f}")
+        else:
+            print(f"{nombre:<16}{0:>7}{'-':>10}{'-':>10}{'-':>10}")
+
+    fallas = []
+    umbrales = [("health", args.max_health_p99), ("lag", args.max_lag_p99)]
+    if args.max_job_p99 is not None:
+        umbrales += [("jobs/ventas", args.max_job_p99), ("jobs/descargas", args.max_job_p99)]
+    for nombre, umbral in umbrales:
+        p99 = percentil(resultados[nombre], 99)
+        if p99 > umbral:
+            fallas.append(f"p99 de {nombre} = {p99:.1f} ms supera el umbral de {umbral:.1f} ms")
+    if errores:
+        fallas.append(f"{len(errores)} requests con error, p. ej.: {errores[0]}")
+
+    for falla in fallas:
+        print(f"FALLA: {falla}")
+    if fallas:
+        sys.exit(1)
+    print("OK")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,5 +1,7 @@
 import json
 import os
+import threading
+import time
 import requests
 from requests import Response
 from dotenv import load_dotenv
@@ -8,59 +10,98 @@ load_dotenv()
 
 BASE_URL = os.environ.get("BASE_URL", " ")
 
-class api_client:
-    """Módulo para interactuar con la API externa de DEBO."""
+# Segundos que se reutiliza un token de la API antes de pedir uno nuevo (solo `ClienteDebo.token`)
+TOKEN_TTL = int(os.environ.get("TOKEN_TTL", "600"))
 
-    @staticmethod
-    def check_url() -> None:
+# Códigos HTTP con los que la API rechaza un token vencido o inválido
+ESTADOS_TOKEN_RECHAZADO = (401, 403)
+
+
+class ClienteDebo:
+    """
+    Cliente de la API de DEBO para un `base_url` y `client_id` dados.
+    Cada instancia tiene su propia sesión HTTP y su propia cache de token, lo que permite
+    atender varios clientes de DEBO (tenants) desde un mismo proceso.
+    """
+
+    def __init__(self, base_url: str | None, client_id: str | None, session=None):
+        self.base_url = base_url
+        self.client_id = client_id
+        # `requests` expone la misma interfaz `request(...)` que una Session
+        self.session = session if session is not None else requests.Session()
+        self._token: str | None = None
+        self._token_vence = 0.0
+        self._lock = threading.Lock()
+
+    def check_url(self) -> None:
         """Verifica si la URL base es correcta o errónea."""
-        if BASE_URL is None:
+        if self.base_url is None:
             raise ValueError(
                 "No se encuentra BASE_URL en archivo .env, revisar si el archivo está en el proyecto o si la variable está bien definida"
             )
-        pass
 
-    @staticmethod
-    def get_token() -> str:
+    def get_token(self) -> str:
         """Obtiene el token de autenticación desde la API"""
-        CLIENT_ID: str | None = os.environ.get("CLIENT_ID")
-        api_client.check_url()
-        url: str = BASE_URL + "token"
-        payload = json.dumps({"client_id": CLIENT_ID})
+        self.check_url()
+        url: str = self.base_url + "token"  # type: ignore
+        payload = json.dumps({"client_id": self.client_id})
         headers = {"Content-Type": "application/json"}
-        response: Response = requests.request("GET", url, headers=headers, data=payload)
+        response: Response = self.session.request("GET", url, headers=headers, data=payload)
         token: str = response.json().get("token")
         return token
 
-    @staticmethod
-    def test_connection(token: str | None) -> int:
+    def token(self) -> str:
+        """Retorna el token cacheado si no venció (TOKEN_TTL), si no pide uno nuevo."""
+        with self._lock:
+            if self._token is None or time.monotonic() >= self._token_vence:
+                self._token = self.get_token()
+                self._token_vence = time.monotonic() + TOKEN_TTL
+            return self._token
+
+    def invalidar_token(self) -> None:
+        """Descarta el token cacheado (p. ej. si la API lo rechazó)."""
+        with self._lock:
+            self._token = None
+
+    def _get_con_token(self, url: str, token: str, payload: str, **kwargs) -> Response:
+        """
+        Hace el GET con `token`. Si la API rechaza el token (401/403) descarta el cacheado,
+        pide uno nuevo y reintenta una sola vez.
+        """
+        headers = {"token": token, "Content-Type": "application/json"}
+        response: Response = self.session.request("GET", url, headers=headers, data=payload, **kwargs)
+        if response.status_code in ESTADOS_TOKEN_RECHAZADO:
+            self.invalidar_token()
+            headers["token"] = self.token()
+            response = self.session.request("GET", url, headers=headers, data=payload, **kwargs)
+        return response
+
+    def test_connection(self, token: str | None) -> int:
         """Prueba la conexión a la API"""
-        api_client.check_url()
-        url: str = BASE_URL + "test"
+        self.check_url()
+        url: str = self.base_url + "test"  # type: ignore
 
         payload = {}
         headers = {"token": token}
 
-        response: Response = requests.request(
+        response: Response = self.session.request(
             "GET", url, headers=headers, data=payload, allow_redirects=False
         )
         return response.status_code
 
-    @staticmethod
-    def get_sectores(token: str):
+    def get_sectores(self, token: str):
         """Obtiene los sectores desde la API"""
-        url: str = BASE_URL + "sectores"
+        url: str = self.base_url + "sectores"  # type: ignore
         payload = {}
         headers = {"token": token}
 
-        sectores: Response = requests.request(
+        sectores: Response = self.session.request(
             "GET", url, headers=headers, data=payload, allow_redirects=False
         )
 
         return sectores.json()
 
-    @staticmethod
-    def get_ventas(token: str, fechaDesde: str, fechaHasta: str, lugar: int = -1):
+    def get_ventas(self, token: str, fechaDesde: str, fechaHasta: str, lugar: int = -1):
         """
         Obtiene las ventas por fecha desde la API
 
@@ -72,18 +113,13 @@ class api_client:
         payload = json.dumps(
             {"fechaDesde": fechaDesde, "fechaHasta": fechaHasta, "lugar": lugar}
         )
-        headers = {"token": token, "Content-Type": "application/json"}
-
-        ventas: Response = requests.request(
-            "GET", BASE_URL + "ventas-fechas", headers=headers, data=payload
-        )
+        ventas: Response = self._get_con_token(self.base_url + "ventas-fechas", token, payload)  # type: ignore
 
         return ventas.json()
 
-    @staticmethod
-    def get_compras(token: str, fechaDesde: str, fechaHasta: str):
+    def get_compras(self, token: str, fechaDesde: str, fechaHasta: str):
         """Obtiene las compras por fecha desde la API"""
-        url = BASE_URL + "compras-fechas"
+        url = self.base_url + "compras-fechas"  # type: ignore
 
         payload = json.dumps(
             {
@@ -91,16 +127,12 @@ class api_client:
                 "fechaHasta": fechaHasta,
             }
         )
-        headers = {"token": token, "Content-Type": "application/json"}
-
-        compras: Response = requests.request(
-            "GET", url, headers=headers, data=payload, allow_redirects=False
-        )
+        compras: Response = self._get_con_token(url, token, payload, allow_redirects=False)
 
         return compras.json()
 
-    @staticmethod
     def get_articulos(
+        self,
         token: str,
         id: int = -1,
         sector: int = -1,
@@ -108,13 +140,70 @@ class api_client:
         rubroMayor: int = -1,
     ):
         """Obtiene los articulos desde la API"""
-        url = BASE_URL + "articulos"
+        url = self.base_url + "articulos"  # type: ignore
 
         payload = {"id": id, "sector": sector, "rubro": rubro, "rubroMayor": rubroMayor}
         headers = {"token": token}
 
-        articulos: Response = requests.request(
+        articulos: Response = self.session.request(
             "GET", url, headers=headers, data=payload, allow_redirects=False
         )
 
         return articulos.json()
+
+
+def _cliente_por_defecto() -> ClienteDebo:
+    """Cliente configurado con BASE_URL y CLIENT_ID del entorno (modo de un solo cliente)."""
+    return ClienteDebo(BASE_URL, os.environ.get("CLIENT_ID"), session=requests)
+
+
+class api_client:
+    """Módulo para interactuar con la API externa de DEBO."""
+
+    @staticmethod
+    def check_url() -> None:
+        """Verifica si la URL base es correcta o errónea."""
+        _cliente_por_defecto().check_url()
+
+    @staticmethod
+    def get_token() -> str:
+        """Obtiene el token de autenticación desde la API"""
+        return _cliente_por_defecto().get_token()
+
+    @staticmethod
+    def test_connection(token: str | None) -> int:
+        """Prueba la conexión a la API"""
+        return _cliente_por_defecto().test_connection(token)
+
+    @staticmethod
+    def get_sectores(token: str):
+        """Obtiene los sectores desde la API"""
+        return _cliente_por_defecto().get_sectores(token)
+
+    @staticmethod
+    def get_ventas(token: str, fechaDesde: str, fechaHasta: str, lugar: int = -1):
+        """
+        Obtiene las ventas por fecha desde la API
+
+        Parámetros:
+
+            fechaDesde (str) en formato "dd/MM/yyyy HH:mm"
+            fechaHasta (str) en formato "dd/MM/yyyy HH:mm"
+        """
+        return _cliente_por_defecto().get_ventas(token, fechaDesde, fechaHasta, lugar)
+
+    @staticmethod
+    def get_compras(token: str, fechaDesde: str, fechaHasta: str):
+        """Obtiene las compras por fecha desde la API"""
+        return _cliente_por_defecto().get_compras(token, fechaDesde, fechaHasta)
+
+    @staticmethod
+    def get_articulos(
+        token: str,
+        id: int = -1,
+        sector: int = -1,
+        rubro: int = -1,
+        rubroMayor: int = -1,
+    ):
+        """Obtiene los articulos desde la API"""
+        return _cliente_por_defecto().get_articulos(token, id, sector, rubro, rubroMayor)
@@ -0,0 +1,173 @@
+import logging
+import uuid
+
+try:
+    # Si está en src/
+    from connection import PoolConexiones
+except ImportError or ModuleNotFoundError:
+    # Si se ejecuta desde raíz
+    from src.connection import PoolConexiones
+
+
+log = logging.getLogger(__name__)
+
+# Reintentos de una ventana antes de marcarla como error
+MAX_INTENTOS = 3
+
+# Ventanas candidatas que lee `reclamar` antes de intentar tomar una (si otro worker ya tomó una, sigue con la siguiente)
+CANDIDATAS_RECLAMO = 10
+
+# `{tabla}` es `trabajos_cola`, salvo en pruebas (ver benchmarks/bench_workers.py)
+DDL_TRABAJOS_COLA = """
+CREATE TABLE {tabla} (
+    id BIGINT IDENTITY(1,1) PRIMARY KEY,
+    job_id NVARCHAR(32) NOT NULL,
+    tenant NVARCHAR(100) NOT NULL,
+    tabla NVARCHAR(20) NOT NULL,
+    fecha_desde NVARCHAR(16) NOT NULL,
+    fecha_hasta NVARCHAR(16) NOT NULL,
+    estado NVARCHAR(20) NOT NULL DEFAULT 'pendiente',
+    worker NVARCHAR(200) NULL,
+    lease_hasta DATETIME2 NULL,
+    heartbeat DATETIME2 NULL,
+    intentos INT NOT NULL DEFAULT 0,
+    error NVARCHAR(MAX) NULL,
+    creado DATETIME2 NOT NULL DEFAULT SYSUTCDATETIME(),
+    terminado DATETIME2 NULL
+)
+"""
+
+
+class ColaSQL:
+    """
+    Cola de ventanas de trabajo en la tabla `trabajos_cola` de SQL Server, repartidas entre workers con leases.
+
+    Un worker reclama una ventana pendiente (o una en curso cuyo lease venció, porque su worker murió),
+    la mantiene renovando el lease con heartbeats y al terminar la marca como `ok` o la devuelve a
+    `pendiente` para reintentarla. El reclamo intercala los tenants y usa READPAST, así dos workers nunca toman la misma fila.
+    Todas las operaciones se commitean enseguida y solo afectan filas cuyo lease sigue siendo del worker.
+    """
+
+    def __init__(self, config: dict | None = None, tamanio_pool: int = 2, tabla: str = "trabajos_cola"):
+        self.pool = PoolConexiones(config, tamanio=tamanio_pool)
+        self.tabla = tabla
+
+    def preparar(self):
+        """Crea la tabla de la cola si no existe."""
+        with self.pool.conexion() as conexion:
+            conexion.cursor().execute(f"IF OBJECT_ID('{self.tabla}', 'U') IS NULL {DDL_TRABAJOS_COLA.format(tabla=self.tabla)}")
+            conexion.commit()
+
+    def encolar(self, tenant: str, tabla: str, ventanas: list[tuple[str, str]]) -> str:
+        """Encola una fila por ventana (fecha_desde, fecha_hasta) y retorna el job_id que las agrupa."""
+        job_id = uuid.uuid4().hex
+        with self.pool.conexion() as conexion:
+            cursor = conexion.cursor()
+            cursor.executemany(
+                f"INSERT INTO {self.tabla} (job_id, tenant, tabla, fecha_desde, fecha_hasta) VALUES (?, ?, ?, ?, ?)",
+                [(job_id, tenant, tabla, desde, hasta) for desde, hasta in ventanas],
+            )
+            conexion.commit()
+        log.info(f"Job {job_id} ({tabla}) del tenant {tenant} encolado en {self.tabla} con {len(ventanas)} ventanas")
+        return job_id
+
+    def reclamar(self, worker: str, lease_segundos: int) -> dict | None:
+        """
+        Toma la próxima ventana disponible con un lease de `lease_segundos`. Retorna None si no hay.
+
+        Las ventanas se intercalan por tenant (la primera pendiente de cada tenant, después la segunda, ...),
+        así un job grande de un tenant no deja esperando a los demás. Primero se leen las candidatas en ese orden
+        sin bloquearlas y después se reclaman de a una con un UPDATE por id que vuelve a verificar que siga
+        disponible: solo queda bloqueada la fila que se toma y dos workers nunca toman la misma.
+        """
+        disponible = "intentos < ? AND (estado = 'pendiente' OR (estado = 'en_curso' AND lease_hasta < SYSUTCDATETIME()))"
+        with self.pool.conexion() as conexion:
+            cursor = conexion.cursor()
+            # Las ventanas cuyo lease venció después del último intento no se van a reclamar más: quedan en error
+            cursor.execute(f"""
+            UPDATE {self.tabla}
+            SET estado = 'error', error = COALESCE(error, 'Lease vencido en el último intento'), terminado = SYSUTCDATETIME()
+            WHERE estado = 'en_curso' AND lease_hasta < SYSUTCDATETIME() AND intentos >= ?
+            """, (MAX_INTENTOS,))
+            conexion.commit()
+
+            cursor.execute(f"""
+            SELECT TOP (?) id
+            FROM {self.tabla} WITH (READPAST)
+            WHERE {disponible}
+            ORDER BY ROW_NUMBER() OVER (PARTITION BY tenant ORDER BY id), id
+            """, (CANDIDATAS_RECLAMO, MAX_INTENTOS))
+            candidatas = [fila[0] for fila in cursor.fetchall()]
+
+            fila = None
+            for id in candidatas:
+                cursor.execute(f"""
+                UPDATE {self.tabla} WITH (ROWLOCK, READPAST)
+                SET estado = 'en_curso', worker = ?, intentos = intentos + 1,
+                    lease_hasta = DATEADD(second, ?, SYSUTCDATETIME()), heartbeat = SYSUTCDATETIME()
+                OUTPUT INSERTED.id, INSERTED.job_id, INSERTED.tenant, INSERTED.tabla,
+                       INSERTED.fecha_desde, INSERTED.fecha_hasta, INSERTED.intentos
+                WHERE id = ? AND {disponible};
+                """, (worker, lease_segundos, id, MAX_INTENTOS))
+                fila = cursor.fetchone()
+                conexion.commit()
+                if fila is not None:
+                    break
+        if fila is None:
+            return None
+        claves = ["id", "job_id", "tenant", "tabla", "fecha_desde", "fecha_hasta", "intentos"]
+        return dict(zip(claves, fila))
+
+    def renovar(self, id: int, worker: str, lease_segundos: int) -> bool:
+        """Extiende el lease. Retorna False si el worker ya no es dueño de la ventana (su lease venció y otro la tomó)."""
+        with self.pool.conexion() as conexion:
+            cursor = conexion.cursor()
+            cursor.execute(f"""
+            UPDATE {self.tabla}
+            SET lease_hasta = DATEADD(second, ?, SYSUTCDATETIME()), heartbeat = SYSUTCDATETIME()
+            WHERE id = ? AND worker = ? AND estado = 'en_curso'
+            """, (lease_segundos, id, worker))
+            renovado = cursor.rowcount > 0
+            conexion.commit()
+        return renovado
+
+    def completar(self, id: int, worker: str):
+        with self.pool.conexion() as conexion:
+            conexion.cursor().execute(f"""
+            UPDATE {self.tabla}
+            SET estado = 'ok', lease_hasta = NULL, error = NULL, terminado = SYSUTCDATETIME()
+            WHERE id = ? AND worker = ? AND estado = 'en_curso'
+            """, (id, worker))
+            conexion.commit()
+
+    def fallar(self, id: int, worker: str, error: str):
+        """Devuelve la ventana a `pendiente` para reintentarla, o la marca `error` si agotó MAX_INTENTOS."""
+        with self.pool.conexion() as conexion:
+            conexion.cursor().execute(f"""
+            UPDATE {self.tabla}
+            SET estado = CASE WHEN intentos >= ? THEN 'error' ELSE 'pendiente' END,
+                lease_hasta = NULL, error = ?,
+                terminado = CASE WHEN intentos >= ? THEN SYSUTCDATETIME() ELSE NULL END
+            WHERE id = ? AND worker = ? AND estado = 'en_curso'
+            """, (MAX_INTENTOS, error, MAX_INTENTOS, id, worker))
+            conexion.commit()
+
+    def estado_job(self, job_id: str) -> dict | None:
+        """Cantidad de ventanas del job por estado, o None si el job no existe."""
+        with self.pool.conexion() as conexion:
+            cursor = conexion.cursor()
+            cursor.execute(f"SELECT tenant, tabla, estado, COUNT(*) FROM {self.tabla} WHERE job_id = ? GROUP BY tenant, tabla, estado", (job_id,))
+            filas = cursor.fetchall()
+        if not filas:
+            return None
+        ventanas = {fila[2]: fila[3] for fila in filas}
+        total = sum(ventanas.values())
+        if ventanas.get("ok", 0) == total:
+            estado = "ok"
+        elif ventanas.get("ok", 0) + ventanas.get("error", 0) == total:
+            estado = "error"
+        elif ventanas.get("en_curso") or ventanas.get("ok") or ventanas.get("error"):
+            estado = "en_curso"
+        else:
+            estado = "pendiente"
+        return {"job_id": job_id, "tenant": filas[0][0], "tipo": filas[0][1], "estado": estado, "ventanas": total, **ventanas}
@@ -1,22 +1,36 @@
 import os
+import queue
+import threading
 import pyodbc
-from dotenv import load_dotenv  
+from contextlib import contextmanager
+from dotenv import load_dotenv
 
 load_dotenv()
 
-def get_connection() -> pyodbc.Connection:
-    """Retorna una conexión a la base de datos SQL Server. Usa variables de entorno definidas en .env."""
-    server = os.environ.get("SQL_SERVER")
-    database = os.environ.get("SQL_DATABASE")
-    username = os.environ.get("SQL_USER")
-    password = os.environ.get("SQL_PASSWORD")
+def get_connection(config: dict | None = None) -> pyodbc.Connection:
+    """
+    Retorna una conexión a la base de datos SQL Server. Usa variables de entorno definidas en .env.
+    Si se pasa `config` (p. ej. de un tenant) se usan sus claves `sql_server`, `sql_database`,
+    `sql_user` y `sql_password` en lugar de las variables de entorno.
+    """
+    if config is None:
+        config = {
+            "sql_server": os.environ.get("SQL_SERVER"),
+            "sql_database": os.environ.get("SQL_DATABASE"),
+            "sql_user": os.environ.get("SQL_USER"),
+            "sql_password": os.environ.get("SQL_PASSWORD"),
+        }
+    server = config.get("sql_server")
+    database = config.get("sql_database")
+    username = config.get("sql_user")
+    password = config.get("sql_password")
     connection_string = (
         f"DRIVER={{ODBC Driver 17 for SQL Server}};"
         f"SERVER={server};"
         f"DATABASE={database};"
         f"UID={username};"
         f"PWD={password};"
-        "Encrypt=yes;TrustServerCertificate=yes;" 
+        "Encrypt=yes;TrustServerCertificate=yes;"
         "ConnectRetryCount=3;"
         "ConnectRetryInterval=10;"
     )
@@ -24,4 +38,72 @@ def get_connection() -> pyodbc.Connection:
     return conn
 
 
+def clave_base(conexion: pyodbc.Connection) -> tuple:
+    """
+    Identifica la base a la que apunta una conexión como (servidor, base). Sirve para guardar estado por base
+    (tablas ya creadas, caches) y no por proceso, ya que un mismo proceso escribe en las bases de varios tenants.
+    Si el driver no informa el nombre se usa la conexión misma como clave.
+    """
+    try:
+        return (conexion.getinfo(pyodbc.SQL_SERVER_NAME), conexion.getinfo(pyodbc.SQL_DATABASE_NAME))
+    except Exception:
+        return ("conexion", id(conexion))
 
+
+# SQLSTATE de errores transitorios de SQL Server: deadlock (40001) y timeout de consulta o de conexión (HYT00, HYT01)
+SQLSTATE_TRANSITORIOS = ("40001", "HYT00", "HYT01")
+
+
+def es_error_transitorio(error: Exception) -> bool:
+    """
+    Indica si un error de pyodbc es transitorio (deadlock, timeout): la misma sentencia puede funcionar
+    si se reintenta, así que no dice nada de los datos. pyodbc los lanza como `pyodbc.Error` con el SQLSTATE en `args[0]`.
+    """
+    if not isinstance(error, pyodbc.Error):
+        return False
+    if error.args and str(error.args[0]) in SQLSTATE_TRANSITORIOS:
+        return True
+    return "deadlock" in str(error).lower()
+
+
+class PoolConexiones:
+    """
+    Pool acotado de conexiones a una base. Reutiliza conexiones ociosas y bloquea
+    si ya hay `tamanio` conexiones en uso. Una conexión que falló durante su uso se descarta.
+    """
+
+    def __init__(self, config: dict | None = None, tamanio: int = 2):
+        self.config = config
+        self.tamanio = tamanio
+        self._libres: queue.LifoQueue[pyodbc.Connection] = queue.LifoQueue()
+        self._cupos = threading.BoundedSemaphore(tamanio)
+
+    @contextmanager
+    def conexion(self):
+        """Presta una conexión del pool durante el bloque `with`."""
+        self._cupos.acquire()
+        try:
+            try:
+                conn = self._libres.get_nowait()
+            except queue.Empty:
+                conn = get_connection(self.config)
+            try:
+                yield conn
+            except Exception:
+                try:
+                    conn.rollback()
+                    conn.close()
+                except Exception:
+                    pass
+                raise
+            self._libres.put(conn)
+        finally:
+            self._cupos.release()
+
+    def cerrar(self):
+        """Cierra todas las conexiones ociosas del pool."""
+        while True:
+            try:
+                self._libres.get_nowait().close()
+            except queue.Empty:
+                return
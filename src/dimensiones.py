@@ -0,0 +1,271 @@
+import hashlib
+import json
+import logging
+import threading
+from pyodbc import Cursor
+
+try:
+    # Si está en src/
+    from utils import get_columnas
+except ImportError or ModuleNotFoundError:
+    # Si se ejecuta desde raíz
+    from src.utils import get_columnas
+
+
+log = logging.getLogger(__name__)
+
+# Por cada tabla de dimensión: columna FK que queda en `ventas` y mapeo columna_ventas -> columna_dimension.
+# La primera columna del mapeo es siempre la clave (id) de la dimensión.
+DIMENSIONES: dict[str, dict[str, str]] = {
+    "clientes": {
+        "clienteId": "id",
+        "clienteRazonSocial": "razonSocial",
+        "clienteCuit": "cuit",
+        "clienteBloqueado": "bloqueado",
+        "clienteHabilitado": "habilitado",
+        "clienteIdDeboCloud": "idDeboCloud",
+    },
+    "responsabilidades": {
+        "responsabilidadId": "id",
+        "responsabilidadDescripcion": "descripcion",
+        "responsabilidadAbreviatura": "abreviatura",
+    },
+    "vendedores": {
+        "vendedorId": "id",
+        "vendedorNombre": "nombre",
+        "vendedorEsEncargado": "esEncargado",
+        "vendedorDni": "dni",
+    },
+    "lugares_venta": {
+        "lugarDeVentaId": "id",
+        "lugarDeVentaDescripcion": "descripcion",
+        "lugarDeVentaEsFranquiciado": "esFranquiciado",
+        "lugarDeVentaHabilitadoMultiplesFormasPago": "habilitadoMultiplesFormasPago",
+    },
+    "cuentas_madre": {
+        "cuentaMadreId": "id",
+        "cuentaMadreDescripcion": "descripcion",
+        "cuentaMadreIdDeboCloud": "idDeboCloud",
+    },
+    "tipos_operacion": {
+        "tipoOperacionId": "id",
+        "tipoOperacionDescripcion": "descripcion",
+    },
+    "monedas": {
+        "monedaId": "id",
+        "monedaDescripcion": "descripcion",
+        "monedaSimbolo": "simbolo",
+        "monedaCodigoAFIP": "codigoAFIP",
+    },
+}
+
+# Por cada tabla de dimensión: objeto del JSON de la API del que sale y su clave de id.
+# En modo normalizado esos objetos se reducen a su id dentro de `jsonOriginal`.
+OBJETOS_JSON: dict[str, tuple[str, str]] = {
+    "clientes": ("cliente", "id"),
+    "responsabilidades": ("responsabilidad", "id"),
+    "vendedores": ("Vendedor", "Id"),
+    "lugares_venta": ("lugarDeVenta", "Id"),
+    "cuentas_madre": ("CuentaMadre", "Id"),
+    "tipos_operacion": ("tipoOperacion", "id"),
+    "monedas": ("Moneda", "Id"),
+}
+
+DDL_DIMENSIONES: dict[str, str] = {
+    "clientes": """
+        id INT NOT NULL PRIMARY KEY,
+        razonSocial NVARCHAR(500) NULL,
+        cuit NVARCHAR(100) NULL,
+        bloqueado BIT NULL,
+        habilitado BIT NULL,
+        idDeboCloud NVARCHAR(100) NULL
+    """,
+    "responsabilidades": """
+        id INT NOT NULL PRIMARY KEY,
+        descripcion NVARCHAR(255) NULL,
+        abreviatura NVARCHAR(100) NULL
+    """,
+    "vendedores": """
+        id INT NOT NULL PRIMARY KEY,
+        nombre NVARCHAR(255) NULL,
+        esEncargado BIT NULL,
+        dni NVARCHAR(20) NULL
+    """,
+    "lugares_venta": """
+        id INT NOT NULL PRIMARY KEY,
+        descripcion NVARCHAR(255) NULL,
+        esFranquiciado BIT NULL,
+        habilitadoMultiplesFormasPago BIT NULL
+    """,
+    "cuentas_madre": """
+        id INT NOT NULL PRIMARY KEY,
+        descripcion NVARCHAR(255) NULL,
+        idDeboCloud NVARCHAR(100) NULL
+    """,
+    "tipos_operacion": """
+        id INT NOT NULL PRIMARY KEY,
+        descripcion NVARCHAR(255) NULL
+    """,
+    "monedas": """
+        id INT NOT NULL PRIMARY KEY,
+        descripcion NVARCHAR(255) NULL,
+        simbolo NVARCHAR(100) NULL,
+        codigoAFIP NVARCHAR(100) NULL
+    """,
+}
+
+# Vista de compatibilidad: expone las columnas originales de `ventas` resolviendo las dimensiones
+VISTA_COMPATIBILIDAD = "ventas_denormalizadas"
+
+# SQL Server admite como máximo 2100 parámetros por sentencia
+MAX_PARAMETROS = 2000
+
+# Cache en memoria del proceso: (base, tabla, id) -> hash de la última fila escrita y confirmada.
+# `base` es la clave de la base (ver `connection.clave_base`): cada tenant tiene sus propias dimensiones.
+_cache: dict[tuple[tuple, str, object], str] = {}
+_lock = threading.Lock()
+
+
+def separar_dimensiones(data_ventas: dict) -> tuple[dict, dict[str, dict]]:
+    """
+    Separa de `data_ventas` las columnas descriptivas de cada dimensión.
+    Retorna `data_ventas` solo con las FKs y un dict {tabla: fila} con las dimensiones presentes.
+
+    Las columnas descriptivas de cada dimensión con id quedan en None (y no se omiten) para que el MERGE las limpie
+    en filas escritas antes en modo desnormalizado, y en `jsonOriginal` esos objetos se reducen a su id.
+    Si una dimensión no tiene id sus columnas descriptivas se mantienen en `ventas`.
+    No modifica `data_ventas` ni el JSON original.
+    """
+    data_fk = dict(data_ventas)
+    filas: dict[str, dict] = {}
+    for tabla, mapeo in DIMENSIONES.items():
+        columnas = list(mapeo.keys())
+        clave = columnas[0]
+        # Sin id no hay fila de dimensión: las columnas descriptivas quedan en `ventas`
+        if data_ventas.get(clave) is None:
+            continue
+        for col in columnas[1:]:
+            data_fk[col] = None
+        filas[tabla] = {mapeo[col]: data_ventas.get(col) for col in columnas}
+
+    original = data_ventas.get("jsonOriginal")
+    if isinstance(original, dict):
+        reducido = dict(original)
+        for tabla in filas:
+            objeto, clave_id = OBJETOS_JSON[tabla]
+            if isinstance(reducido.get(objeto), dict):
+                reducido[objeto] = {clave_id: reducido[objeto].get(clave_id)}
+        data_fk["jsonOriginal"] = reducido
+    return data_fk, filas
+
+
+def _hash_fila(fila: dict) -> str:
+    return hashlib.md5(json.dumps(fila, sort_keys=True, default=str).encode()).hexdigest()
+
+
+class dimensiones:
+    """Módulo para mantener las tablas de dimensión de ventas con cache de claves en memoria."""
+
+    @staticmethod
+    def crear_esquema(cursor: Cursor):
+        """
+        Crea las tablas de dimensión si no existen y (re)crea la vista de compatibilidad.
+        No hace commit.
+        """
+        for tabla, columnas in DDL_DIMENSIONES.items():
+            cursor.execute(f"IF OBJECT_ID('{tabla}', 'U') IS NULL CREATE TABLE {tabla} ({columnas})")
+        dimensiones.crear_vista(cursor)
+
+    @staticmethod
+    def crear_vista(cursor: Cursor):
+        """
+        Crea o altera la vista `ventas_denormalizadas` con las mismas columnas que `ventas`.
+        Las columnas descriptivas se toman de la tabla de dimensión correspondiente, así reflejan
+        su último valor; si no hay fila de dimensión se usa la de `ventas` (filas previas al modo normalizado).
+        """
+        columnas_ventas = get_columnas('ventas', cursor)
+        origen: dict[str, tuple[str, str]] = {}
+        joins = []
+        for n, (tabla, mapeo) in enumerate(DIMENSIONES.items()):
+            alias = f"d{n}"
+            columnas = list(mapeo.keys())
+            joins.append(f"LEFT JOIN {tabla} AS {alias} ON {alias}.id = v.{columnas[0]}")
+            for col in columnas[1:]:
+                origen[col] = (alias, mapeo[col])
+
+        select = ', '.join([
+            f"COALESCE({origen[col][0]}.{origen[col][1]}, v.{col}) AS {col}" if col in origen else f"v.{col}"
+            for col in columnas_ventas
+        ])
+        cursor.execute(f"CREATE OR ALTER VIEW {VISTA_COMPATIBILIDAD} AS SELECT {select} FROM ventas AS v {' '.join(joins)}")
+
+    @staticmethod
+    def upsert(filas_lote: list[dict[str, dict]], cursor: Cursor, base: tuple = ()) -> list[tuple[tuple, str]]:
+        """
+        Inserta o actualiza con MERGE las filas de dimensión de un lote que sean nuevas o hayan cambiado
+        respecto de la cache de la base `base`. Hace un solo MERGE por tabla (partido si supera el límite de parámetros).
+
+        Retorna las entradas pendientes de confirmar en la cache: se deben pasar a `confirmar`
+        recién después del commit, así un rollback no deja la cache desincronizada.
+        """
+        pendientes = []
+        for tabla in DIMENSIONES:
+            # Dedupe por id dentro del lote (MERGE no admite claves repetidas en source)
+            por_id: dict[object, dict] = {}
+            for filas in filas_lote:
+                if tabla in filas:
+                    por_id[filas[tabla]['id']] = filas[tabla]
+
+            cambiadas = []
+            with _lock:
+                for id_, fila in por_id.items():
+                    hash_fila = _hash_fila(fila)
+                    if _cache.get((base, tabla, id_)) != hash_fila:
+                        cambiadas.append(fila)
+                        pendientes.append(((base, tabla, id_), hash_fila))
+
+            if not cambiadas:
+                continue
+
+            columnas = list(DIMENSIONES[tabla].values())
+            filas_por_query = max(1, MAX_PARAMETROS // len(columnas))
+            for i in range(0, len(cambiadas), filas_por_query):
+                dimensiones._merge(tabla, columnas, cambiadas[i:i+filas_por_query], cursor)
+            log.info(f"Dimensión {tabla}: {len(cambiadas)} filas nuevas o modificadas")
+
+        return pendientes
+
+    @staticmethod
+    def _merge(tabla: str, columnas: list[str], filas: list[dict], cursor: Cursor):
+        """MERGE de varias filas de una dimensión usando `id` como clave."""
+        placeholders_por_fila = ', '.join([f'? AS {col}' for col in columnas])
+        source_values = ' UNION ALL '.join([f'SELECT {placeholders_por_fila}' for _ in filas])
+        update_set = ', '.join([f"target.{col} = source.{col}" for col in columnas if col != 'id'])
+        insert_cols = ', '.join(columnas)
+        insert_vals = ', '.join([f"source.{col}" for col in columnas])
+
+        query = f"""
+        MERGE {tabla} AS target
+        USING ({source_values}) AS source ({', '.join(columnas)})
+        ON target.id = source.id
+        WHEN MATCHED THEN
+            UPDATE SET {update_set}
+        WHEN NOT MATCHED THEN
+            INSERT ({insert_cols})
+            VALUES ({insert_vals});
+        """
+        params = tuple(fila[col] for fila in filas for col in columnas)
+        cursor.execute(query, params)
+
+    @staticmethod
+    def confirmar(pendientes: list[tuple[tuple, str]]):
+        """Registra en la cache las filas de dimensión ya commiteadas."""
+        with _lock:
+            for clave, hash_fila in pendientes:
+                _cache[clave] = hash_fila
+
+    @staticmethod
+    def limpiar_cache():
+        """Vacía la cache de dimensiones (p. ej. si se modificaron las tablas por fuera del servicio)."""
+        with _lock:
+            _cache.clear()
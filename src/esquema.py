@@ -0,0 +1,441 @@
+import logging
+import sys
+from pyodbc import Connection, Cursor
+from typing import Callable
+
+try:
+    # Si está en src/
+    from dimensiones import DDL_DIMENSIONES
+    from insertar_datos import insertar, COLUMNAS_CLAVE_DEAD_LETTER, DDL_VENTAS_DEAD_LETTER, DDL_VENTAS_RESUMEN
+    from cola import DDL_TRABAJOS_COLA
+except ImportError or ModuleNotFoundError:
+    # Si se ejecuta desde raíz
+    from src.dimensiones import DDL_DIMENSIONES
+    from src.insertar_datos import insertar, COLUMNAS_CLAVE_DEAD_LETTER, DDL_VENTAS_DEAD_LETTER, DDL_VENTAS_RESUMEN
+    from src.cola import DDL_TRABAJOS_COLA
+
+
+log = logging.getLogger(__name__)
+
+# Claves naturales que usan los MERGE de `insertar` para cada tabla.
+# Cada una necesita un índice cuyas columnas iniciales sean exactamente estas, si no el MERGE escanea la tabla.
+CLAVES_MERGE: dict[str, list[str]] = {
+    "ventas": ["letra", "tipo", "sucursal", "numero"],
+    "ventas_cuerpo": ["ventaId", "item"],
+    "ventas_formaspago_detalle": ["ventaId"],
+    "descargas_comb": ["letra", "tipo", "sucursal", "numero", "item"],
+}
+
+
+def _crear_tabla(tabla: str, columnas: str) -> str:
+    return f"IF OBJECT_ID('{tabla}', 'U') IS NULL CREATE TABLE {tabla} ({columnas})"
+
+
+def _crear_indice(nombre: str, tabla: str, columnas: list[str], unico: bool = True, incluir: list[str] | None = None) -> str:
+    include = f" INCLUDE ({', '.join(incluir)})" if incluir else ""
+    return (
+        f"IF NOT EXISTS (SELECT 1 FROM sys.indexes WHERE name = '{nombre}' AND object_id = OBJECT_ID('{tabla}')) "
+        f"CREATE {'UNIQUE ' if unico else ''}NONCLUSTERED INDEX {nombre} ON {tabla} ({', '.join(columnas)}){include}"
+    )
+
+
+COLUMNAS_VENTAS = """
+        id INT IDENTITY(1,1) PRIMARY KEY,
+        letra NVARCHAR(5) NOT NULL,
+        tipo NVARCHAR(10) NOT NULL,
+        sucursal INT NOT NULL,
+        numero BIGINT NOT NULL,
+        fechaHora DATETIME2,
+        clienteId INT,
+        clienteRazonSocial NVARCHAR(500),
+        clienteCuit NVARCHAR(100),
+        clienteBloqueado BIT,
+        clienteHabilitado BIT,
+        clienteIdDeboCloud NVARCHAR(100),
+        razonSocialClienteHistorico NVARCHAR(500),
+        CUITHistorico NVARCHAR(100),
+        responsabilidadId INT,
+        responsabilidadDescripcion NVARCHAR(100),
+        responsabilidadAbreviatura NVARCHAR(100),
+        formaDePagoId INT,
+        formaDePagoDescripcion NVARCHAR(100),
+        importeDescuento DECIMAL(18,4),
+        importeNetoGravado DECIMAL(18,4),
+        importeNetoExento DECIMAL(18,4),
+        importeIVA DECIMAL(18,4),
+        importeIVAServicios DECIMAL(18,4),
+        importeImpuestoInterno1 DECIMAL(18,4),
+        importeImpuestoInterno2 DECIMAL(18,4),
+        importeImpuestoInterno3 DECIMAL(18,4),
+        importePercepcion DECIMAL(18,4),
+        importeRedondeo DECIMAL(18,4),
+        importePercepcionIVA DECIMAL(18,4),
+        importeTotal DECIMAL(18,4),
+        idTurno INT,
+        idEmpresa INT,
+        fechaVencimiento DATETIME2,
+        vendedorId INT,
+        vendedorNombre NVARCHAR(100),
+        vendedorEsEncargado BIT,
+        vendedorDni NVARCHAR(20),
+        estado NVARCHAR(50),
+        numeroPlanilla INT,
+        lugarDeVentaId INT,
+        lugarDeVentaDescripcion NVARCHAR(100),
+        lugarDeVentaEsFranquiciado BIT,
+        lugarDeVentaHabilitadoMultiplesFormasPago BIT,
+        preparado BIT,
+        cuentaMadreId INT,
+        cuentaMadreDescripcion NVARCHAR(100),
+        cuentaMadreIdDeboCloud NVARCHAR(100),
+        esFacturaRemito BIT,
+        numeroCAI NVARCHAR(100),
+        fechaVencimientoCAI DATETIME2,
+        numeroNotaLiquidoProducto NVARCHAR(100),
+        multiplicadorSucursalComprobanteRepetido INT,
+        notaDePedido NVARCHAR(100),
+        numeroCAE NVARCHAR(100),
+        fechaVencimientoCAE DATETIME2,
+        tipoCalculoPercepcion INT,
+        idLoteVenta INT,
+        tipoOperacionId INT,
+        tipoOperacionDescripcion NVARCHAR(100),
+        monedaId INT,
+        monedaDescripcion NVARCHAR(100),
+        monedaSimbolo NVARCHAR(100),
+        monedaCodigoAFIP NVARCHAR(100),
+        cotizacionHistorica DECIMAL(18,4),
+        observacionFacturaElectronica NVARCHAR(500),
+        esFacturaElectronicaCAEA BIT,
+        CAEAInformado BIT,
+        numeroComanda NVARCHAR(100),
+        esFacturaComplemento BIT,
+        conductor NVARCHAR(100),
+        marcaVehiculo NVARCHAR(100),
+        patente NVARCHAR(100),
+        reparticion_kms NVARCHAR(100),
+        vale NVARCHAR(100),
+        orden NVARCHAR(100),
+        jsonOriginal NVARCHAR(MAX)
+"""
+
+COLUMNAS_VENTAS_CUERPO = """
+        id INT IDENTITY(1,1) PRIMARY KEY,
+        ventaId INT NOT NULL REFERENCES ventas(id),
+        item INT NOT NULL,
+        idSector INT,
+        idArticulo INT,
+        idRubro INT,
+        descripcion NVARCHAR(500),
+        cantidad DECIMAL(18,4),
+        precioVentaCobrado DECIMAL(18,4),
+        precioVentaLista DECIMAL(18,4),
+        precioCosto DECIMAL(18,4),
+        tasaIVA DECIMAL(18,4),
+        impuestoInterno1 DECIMAL(18,4),
+        impuestoInterno2 DECIMAL(18,4),
+        impuestoInterno3 DECIMAL(18,4),
+        idIVA INT,
+        idCodigoSurtidor INT
+"""
+
+COLUMNAS_VENTAS_FORMASPAGO_DETALLE = """
+        id INT IDENTITY(1,1) PRIMARY KEY,
+        ventaId INT NOT NULL REFERENCES ventas(id),
+        fpa INT,
+        descripcion NVARCHAR(500),
+        importe DECIMAL(18,4),
+        tarjetaDescripcion NVARCHAR(100),
+        tarjetaNumeroCupon NVARCHAR(100),
+        tarjetaNumeroLote NVARCHAR(100),
+        chequesLibrador NVARCHAR(100),
+        chequesBancoDescripcion NVARCHAR(100),
+        chequesNumero NVARCHAR(100),
+        AppYPFNumeroTransaccion NVARCHAR(100),
+        valesSucursal INT,
+        valesNumero NVARCHAR(100),
+        MercadoPagoNumeroTransaccion NVARCHAR(100),
+        AppYPF_gateways NVARCHAR(500),
+        AppYPF_gateways_id NVARCHAR(100)
+"""
+
+COLUMNAS_DESCARGAS_COMB = """
+        id INT IDENTITY(1,1) PRIMARY KEY,
+        letra NVARCHAR(5) NOT NULL,
+        tipo NVARCHAR(10) NOT NULL,
+        sucursal INT NOT NULL,
+        numero BIGINT NOT NULL,
+        proveedorRazonSocial NVARCHAR(500),
+        proveedorCUIT NVARCHAR(100),
+        fechaComprobante DATETIME2,
+        vendedorID INT,
+        vendedorNombre NVARCHAR(100),
+        vendedorEsEncargado BIT,
+        item INT NOT NULL,
+        idSector INT,
+        idArticulo INT,
+        idRubro INT,
+        descripcion NVARCHAR(500),
+        cantidad DECIMAL(18,4),
+        importeCompra DECIMAL(18,4),
+        importeImpuestoInterno DECIMAL(18,4),
+        importeIVA DECIMAL(18,4),
+        importeDescuentoItem DECIMAL(18,4),
+        esCombustible BIT,
+        idTanque INT,
+        precioCosto DECIMAL(18,4),
+        tasaIVA DECIMAL(18,4)
+"""
+
+# Migraciones versionadas: (versión, descripción, sentencias). Nunca modificar una versión ya publicada,
+# agregar una nueva. Todas las sentencias son idempotentes para poder aplicarse sobre bases existentes.
+MIGRACIONES: list[tuple[int, str, list[str]]] = [
+    (1, "Tablas de ventas y descargas", [
+        _crear_tabla("ventas", COLUMNAS_VENTAS),
+        _crear_tabla("ventas_cuerpo", COLUMNAS_VENTAS_CUERPO),
+        _crear_tabla("ventas_formaspago_detalle", COLUMNAS_VENTAS_FORMASPAGO_DETALLE),
+        _crear_tabla("descargas_comb", COLUMNAS_DESCARGAS_COMB),
+    ]),
+    (2, "Índices únicos sobre las claves de los MERGE", [
+        _crear_indice("UX_ventas_clave", "ventas", CLAVES_MERGE["ventas"]),
+        _crear_indice("UX_ventas_cuerpo_clave", "ventas_cuerpo", CLAVES_MERGE["ventas_cuerpo"]),
+        _crear_indice("UX_ventas_formaspago_detalle_clave", "ventas_formaspago_detalle", CLAVES_MERGE["ventas_formaspago_detalle"]),
+        _crear_indice("UX_descargas_comb_clave", "descargas_comb", CLAVES_MERGE["descargas_comb"]),
+    ]),
+    (3, "Índices por fecha para reconciliación", [
+        _crear_indice("IX_ventas_fechaHora", "ventas", ["fechaHora"], unico=False, incluir=["idTurno", "importeTotal", "numero"]),
+        _crear_indice("IX_descargas_comb_fechaComprobante", "descargas_comb", ["fechaComprobante"], unico=False, incluir=["importeCompra", "numero"]),
+    ]),
+    (4, "Tabla ventas_dead_letter", [
+        f"IF OBJECT_ID('ventas_dead_letter', 'U') IS NULL {DDL_VENTAS_DEAD_LETTER}",
+    ]),
+    (5, "Tablas de dimensión de ventas", [
+        _crear_tabla(tabla, columnas) for tabla, columnas in DDL_DIMENSIONES.items()
+    ]),
+    (6, "Resumen de ventas por turno", [
+        f"IF OBJECT_ID('ventas_resumen', 'U') IS NULL {DDL_VENTAS_RESUMEN}",
+        _crear_indice("IX_ventas_idTurno", "ventas", ["idTurno"], unico=False, incluir=["fechaHora", "lugarDeVentaId", "formaDePagoId", "importeTotal"]),
+    ]),
+    (7, "Cola de trabajos para workers", [
+        f"IF OBJECT_ID('trabajos_cola', 'U') IS NULL {DDL_TRABAJOS_COLA.format(tabla='trabajos_cola')}",
+        _crear_indice("IX_trabajos_cola_estado", "trabajos_cola", ["estado", "id"], unico=False),
+        _crear_indice("IX_trabajos_cola_job", "trabajos_cola", ["job_id"], unico=False),
+    ]),
+    (8, "Claves de ventas_dead_letter como texto", [
+        f"ALTER TABLE ventas_dead_letter ALTER COLUMN {col} NVARCHAR(MAX) NULL" for col in COLUMNAS_CLAVE_DEAD_LETTER
+    ]),
+    (9, "Índice de ventas por turno y fecha para el resumen", [
+        _crear_indice("IX_ventas_idTurno_fechaHora", "ventas", ["idTurno", "fechaHora"], unico=False, incluir=["lugarDeVentaId", "formaDePagoId", "importeTotal"]),
+        # Reemplazado por el anterior: con solo 3 turnos no es selectivo
+        "IF EXISTS (SELECT 1 FROM sys.indexes WHERE name = 'IX_ventas_idTurno' AND object_id = OBJECT_ID('ventas')) DROP INDEX IX_ventas_idTurno ON ventas",
+    ]),
+    (10, "Columnas de dimensión tan anchas como las de ventas", [
+        f"IF OBJECT_ID('{tabla}', 'U') IS NOT NULL ALTER TABLE {tabla} ALTER COLUMN {columna} {tipo} NULL"
+        for tabla, columna, tipo in [
+            ("clientes", "razonSocial", "NVARCHAR(500)"),
+            ("clientes", "cuit", "NVARCHAR(100)"),
+            ("responsabilidades", "abreviatura", "NVARCHAR(100)"),
+            ("monedas", "simbolo", "NVARCHAR(100)"),
+            ("monedas", "codigoAFIP", "NVARCHAR(100)"),
+        ]
+    ]),
+]
+
+
+def claves_duplicadas(cursor: Cursor, limite: int = 10) -> list[str]:
+    """
+    Busca claves de MERGE repetidas en las tablas existentes de CLAVES_MERGE, que impedirían crear sus índices únicos.
+    Retorna una descripción por cada clave repetida (hasta `limite` por tabla).
+    """
+    duplicadas = []
+    for tabla, claves in CLAVES_MERGE.items():
+        cursor.execute(f"SELECT OBJECT_ID('{tabla}', 'U')")
+        fila = cursor.fetchone()
+        if not fila or fila[0] is None:
+            continue
+        columnas = ', '.join(claves)
+        cursor.execute(f"""
+        SELECT TOP ({int(limite)}) {columnas}, COUNT(*)
+        FROM {tabla}
+        GROUP BY {columnas}
+        HAVING COUNT(*) > 1
+        ORDER BY COUNT(*) DESC
+        """)
+        for fila in cursor.fetchall():
+            valores = ', '.join(f"{col}={valor!r}" for col, valor in zip(claves, fila))
+            duplicadas.append(f"{tabla} ({valores}): {fila[-1]} filas")
+    return duplicadas
+
+
+# Verificaciones que se corren antes de aplicar una migración. Si retornan problemas la migración no se aplica.
+VERIFICACIONES_PREVIAS: dict[int, Callable[[Cursor], list[str]]] = {
+    2: claves_duplicadas,
+}
+
+
+def version_actual(cursor: Cursor) -> int:
+    """Retorna la última versión de esquema aplicada (0 si nunca se aplicó ninguna). Crea `schema_version` si no existe."""
+    cursor.execute(_crear_tabla("schema_version", """
+        version INT NOT NULL PRIMARY KEY,
+        descripcion NVARCHAR(255) NULL,
+        aplicada DATETIME2 NOT NULL DEFAULT SYSDATETIME()
+    """))
+    cursor.execute("SELECT MAX(version) FROM schema_version")
+    fila = cursor.fetchone()
+    return (fila[0] if fila else None) or 0
+
+
+def aplicar_migraciones(conexion: Connection) -> int:
+    """
+    Aplica en orden las migraciones pendientes, cada una en su propia transacción.
+    Antes de cada una corre su verificación previa, si tiene (ver VERIFICACIONES_PREVIAS), y lanza ValueError
+    con los problemas encontrados en lugar del error de SQL. Retorna la versión final del esquema.
+    """
+    cursor: Cursor = conexion.cursor()
+    actual = version_actual(cursor)
+    conexion.commit()
+
+    for version, descripcion, sentencias in MIGRACIONES:
+        if version <= actual:
+            continue
+        verificar = VERIFICACIONES_PREVIAS.get(version)
+        problemas = verificar(cursor) if verificar else []
+        if problemas:
+            for problema in problemas:
+                log.error(f"Migración {version}: clave repetida en {problema}")
+            raise ValueError(
+                f"No se puede aplicar la migración {version} ({descripcion}): hay {len(problemas)} claves repetidas, "
+                f"p. ej. {problemas[0]}. Eliminar los duplicados y volver a migrar."
+            )
+        log.info(f"Aplicando migración {version}: {descripcion}")
+        try:
+            for sentencia in sentencias:
+                cursor.execute(sentencia)
+            cursor.execute("INSERT INTO schema_version (version, descripcion) VALUES (?, ?)", (version, descripcion))
+            conexion.commit()
+        except Exception as e:
+            log.error(f"Error aplicando migración {version}: {e}")
+            conexion.rollback()
+            raise
+        actual = version
+
+    cursor.close()
+    return actual
+
+
+def indices_faltantes(cursor: Cursor) -> list[str]:
+    """
+    Verifica que cada tabla de CLAVES_MERGE tenga un índice cuyas primeras columnas sean su clave de MERGE.
+    Retorna una descripción por cada tabla o índice faltante (lista vacía si está todo bien).
+    """
+    faltantes = []
+    for tabla, claves in CLAVES_MERGE.items():
+        cursor.execute(f"SELECT OBJECT_ID('{tabla}', 'U')")
+        fila = cursor.fetchone()
+        if not fila or fila[0] is None:
+            faltantes.append(f"No existe la tabla {tabla}")
+            continue
+
+        cursor.execute("""
+        SELECT i.name, c.name
+        FROM sys.indexes AS i
+        JOIN sys.index_columns AS ic ON ic.object_id = i.object_id AND ic.index_id = i.index_id
+        JOIN sys.columns AS c ON c.object_id = ic.object_id AND c.column_id = ic.column_id
+        WHERE i.object_id = OBJECT_ID(?) AND ic.is_included_column = 0 AND ic.key_ordinal > 0
+        ORDER BY i.name, ic.key_ordinal
+        """, (tabla,))
+        columnas_por_indice: dict[str, list[str]] = {}
+        for nombre, columna in cursor.fetchall():
+            columnas_por_indice.setdefault(nombre, []).append(columna.lower())
+
+        esperado = {c.lower() for c in claves}
+        if not any(set(cols[:len(claves)]) == esperado for cols in columnas_por_indice.values()):
+            faltantes.append(f"Falta índice sobre {tabla} ({', '.join(claves)}): cada MERGE va a escanear la tabla")
+    return faltantes
+
+
+def verificar_esquema(conexion: Connection, base: str | None = None) -> list[str]:
+    """
+    Loguea un warning por cada índice de MERGE faltante y retorna la lista de faltantes.
+    `base` (p. ej. el id del tenant) solo se usa para identificar la base en los logs.
+    """
+    cursor: Cursor = conexion.cursor()
+    faltantes = indices_faltantes(cursor)
+    cursor.close()
+    prefijo = f"Esquema ({base})" if base else "Esquema"
+    for faltante in faltantes:
+        log.warning(f"{prefijo}: {faltante}. Ejecutar `python -m src.esquema migrar`.")
+    if not faltantes:
+        log.info(f"{prefijo}: índices de MERGE verificados")
+    return faltantes
+
+
+# Pares (día, turno) que recalcula cada transacción del backfill de `ventas_resumen` (2 parámetros por par)
+PARES_POR_LOTE_RESUMEN = 500
+
+
+def rellenar_resumen(conexion: Connection, prefijo: str = "Resumen") -> int:
+    """
+    Backfill de `ventas_resumen`: recalcula con `insertar.ventas_resumen` todos los (día, idTurno) que hay en `ventas`,
+    en transacciones de PARES_POR_LOTE_RESUMEN pares. Se puede volver a correr: recalcula, no suma.
+    Hace falta una vez después de migrar a la versión 6, porque el resumen solo se mantiene para las ventas
+    que se sincronizan desde entonces. Retorna la cantidad de pares recalculados.
+    """
+    cursor: Cursor = conexion.cursor()
+    cursor.execute(f"IF OBJECT_ID('ventas_resumen', 'U') IS NULL {DDL_VENTAS_RESUMEN}")
+    conexion.commit()
+    cursor.execute("""
+        SELECT DISTINCT CAST(fechaHora AS date), idTurno FROM ventas
+        WHERE fechaHora IS NOT NULL AND idTurno IS NOT NULL
+        ORDER BY 1, 2
+    """)
+    pares = [(fila[0], fila[1]) for fila in cursor.fetchall()]
+
+    for i in range(0, len(pares), PARES_POR_LOTE_RESUMEN):
+        try:
+            insertar.ventas_resumen(set(pares[i:i+PARES_POR_LOTE_RESUMEN]), cursor)
+            conexion.commit()
+        except Exception:
+            conexion.rollback()
+            raise
+        log.info(f"{prefijo}: {min(i + PARES_POR_LOTE_RESUMEN, len(pares))}/{len(pares)} días y turnos recalculados")
+    cursor.close()
+    return len(pares)
+
+
+if __name__ == "__main__":
+    # python -m src.esquema [migrar|verificar|resumen] [tenant_id]
+    # Sin tenant_id recorre todos los tenants (sin tenants configurados, la base de las variables SQL_*).
+    try:
+        from tenants import get_tenants
+    except ImportError or ModuleNotFoundError:
+        from src.tenants import get_tenants
+
+    logging.basicConfig(level=logging.INFO)
+    accion = sys.argv[1] if len(sys.argv) > 1 else "verificar"
+    if accion not in ("migrar", "verificar", "resumen"):
+        sys.exit(f"Acción desconocida: {accion}. Use 'migrar', 'verificar' o 'resumen'.")
+    tenants = get_tenants()
+    if len(sys.argv) > 2:
+        if sys.argv[2] not in tenants:
+            sys.exit(f"Tenant {sys.argv[2]} no configurado.")
+        tenants = {sys.argv[2]: tenants[sys.argv[2]]}
+
+    errores = 0
+    for tenant_id, tenant in tenants.items():
+        with tenant.pool.conexion() as conexion:
+            if accion == "migrar":
+                try:
+                    log.info(f"Esquema ({tenant_id}) en versión {aplicar_migraciones(conexion)}")
+                except ValueError as e:
+                    log.error(f"Esquema ({tenant_id}): {e}")
+                    errores += 1
+            elif accion == "resumen":
+                try:
+                    log.info(f"Resumen ({tenant_id}): {rellenar_resumen(conexion, f'Resumen ({tenant_id})')} días y turnos recalculados")
+                except Exception as e:
+                    log.error(f"Resumen ({tenant_id}): {e}")
+                    errores += 1
+            elif verificar_esquema(conexion, tenant_id):
+                errores += 1
+    sys.exit(1 if errores else 0)
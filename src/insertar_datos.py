@@ -1,6 +1,36 @@
 import json
 from pyodbc import Cursor
 
+# Las claves se guardan como texto sin límite: una venta que falló por el tipo o el largo de su clave
+# tiene que poder guardarse igual.
+COLUMNAS_CLAVE_DEAD_LETTER = ['letra', 'tipo', 'sucursal', 'numero']
+
+DDL_VENTAS_DEAD_LETTER = """
+CREATE TABLE ventas_dead_letter (
+    id INT IDENTITY(1,1) PRIMARY KEY,
+    letra NVARCHAR(MAX) NULL,
+    tipo NVARCHAR(MAX) NULL,
+    sucursal NVARCHAR(MAX) NULL,
+    numero NVARCHAR(MAX) NULL,
+    error NVARCHAR(MAX) NULL,
+    jsonOriginal NVARCHAR(MAX) NULL,
+    fecha DATETIME2 NOT NULL DEFAULT SYSDATETIME()
+)
+"""
+
+# Resumen por (fecha, turno, lugar de venta, forma de pago). Las claves nulas se guardan como -1.
+DDL_VENTAS_RESUMEN = """
+CREATE TABLE ventas_resumen (
+    fecha DATE NOT NULL,
+    idTurno INT NOT NULL,
+    lugarDeVentaId INT NOT NULL,
+    formaDePagoId INT NOT NULL,
+    cantidad INT NOT NULL,
+    importeTotal DECIMAL(18,4) NULL,
+    actualizado DATETIME2 NOT NULL DEFAULT SYSDATETIME(),
+    CONSTRAINT PK_ventas_resumen PRIMARY KEY (fecha, idTurno, lugarDeVentaId, formaDePagoId)
+)
+"""
 
 class insertar:
     """Módulo para insertar datos en la base de datos."""
@@ -138,6 +168,72 @@ class insertar:
         """
         cursor.execute(query, tuple(data_formaspago.values()))
 
+    @staticmethod
+    def ventas_resumen(pares: set[tuple], cursor: Cursor):
+        """
+        Recalcula en `ventas_resumen` las filas de los pares (día, idTurno) dados a partir de `ventas`, usando MERGE.
+        El día debe ser un `date` (ver `utils.parse_dia`), así no depende del DATEFORMAT de la sesión.
+        Solo lee las ventas de esos días y turnos (por rango sobre `fechaHora`, con el índice `(idTurno, fechaHora)`)
+        y solo toca las filas del resumen de esos pares. Al recalcular (y no sumar deltas) es correcto
+        aunque una venta se vuelva a sincronizar. No hace commit.
+        """
+        pares = {(dia, turno) for dia, turno in pares if dia is not None and turno is not None}
+        if not pares:
+            return
+
+        claves = ['fecha', 'idTurno', 'lugarDeVentaId', 'formaDePagoId']
+        valores = ', '.join(['(?, ?)' for _ in pares])
+        on_clause = ' AND '.join([f"target.{col} = source.{col}" for col in claves])
+
+        query = f"""
+        WITH pares (fecha, idTurno) AS (
+            SELECT DISTINCT fecha, idTurno FROM (VALUES {valores}) AS p (fecha, idTurno)
+        ),
+        objetivo AS (
+            SELECT r.* FROM ventas_resumen AS r
+            WHERE EXISTS (SELECT 1 FROM pares AS p WHERE p.fecha = r.fecha AND p.idTurno = r.idTurno)
+        )
+        MERGE objetivo AS target
+        USING (
+            SELECT p.fecha, v.idTurno, ISNULL(v.lugarDeVentaId, -1), ISNULL(v.formaDePagoId, -1),
+                   COUNT(*), SUM(v.importeTotal)
+            FROM pares AS p
+            JOIN ventas AS v
+              ON v.idTurno = p.idTurno AND v.fechaHora >= p.fecha AND v.fechaHora < DATEADD(day, 1, p.fecha)
+            GROUP BY p.fecha, v.idTurno, ISNULL(v.lugarDeVentaId, -1), ISNULL(v.formaDePagoId, -1)
+        ) AS source (fecha, idTurno, lugarDeVentaId, formaDePagoId, cantidad, importeTotal)
+        ON {on_clause}
+        WHEN MATCHED THEN
+            UPDATE SET target.cantidad = source.cantidad, target.importeTotal = source.importeTotal, target.actualizado = SYSDATETIME()
+        WHEN NOT MATCHED THEN
+            INSERT (fecha, idTurno, lugarDeVentaId, formaDePagoId, cantidad, importeTotal)
+            VALUES (source.fecha, source.idTurno, source.lugarDeVentaId, source.formaDePagoId, source.cantidad, source.importeTotal)
+        WHEN NOT MATCHED BY SOURCE THEN
+            DELETE;
+        """
+        cursor.execute(query, tuple(v for par in pares for v in par))
+
+    @staticmethod
+    def venta_dead_letter(data: dict, error: str, cursor: Cursor, json_original=None):
+        """
+        Inserta en la tabla `ventas_dead_letter` una venta que no se pudo insertar,
+        con su clave, el error y el JSON original. Crea la tabla si no existe.
+        `json_original` es la venta completa de la API; si no se pasa se usa `data['jsonOriginal']`.
+        """
+        cursor.execute(f"IF OBJECT_ID('ventas_dead_letter', 'U') IS NULL {DDL_VENTAS_DEAD_LETTER}")
+
+        if json_original is None:
+            json_original = data.get('jsonOriginal')
+        if not isinstance(json_original, str):
+            json_original = json.dumps(json_original, default=str)
+
+        claves = [None if data.get(col) is None else str(data.get(col)) for col in COLUMNAS_CLAVE_DEAD_LETTER]
+        query = """
+        INSERT INTO ventas_dead_letter (letra, tipo, sucursal, numero, error, jsonOriginal)
+        VALUES (?, ?, ?, ?, ?, ?);
+        """
+        cursor.execute(query, (*claves, error, json_original))
+
     @staticmethod
     def descargas(data: dict, cursor: Cursor):
         """
@@ -1,9 +1,13 @@
 import logging
 import os
 import dotenv
+import threading
 import time
+import uuid
 
+from contextlib import asynccontextmanager
 from fastapi import FastAPI, Query, HTTPException
+from fastapi.concurrency import run_in_threadpool
 from pyodbc import Connection
 from datetime import datetime, timedelta
 from typing import TypeAlias
@@ -11,26 +15,99 @@ from typing import TypeAlias
 try:
     # Si está en src/
     from .api_client import api_client
-    from .connection import get_connection
+    from .connection import get_connection, PoolConexiones
     from .procesamiento import procesar_datos
-    from .utils import get_fechas_procesadas, get_fechas_procesadas_descargas
+    from .utils import get_fechas_procesadas, get_fechas_procesadas_descargas, dividir_por_dia
+    from .perfilado import debe_perfilar, obtener_perfil, perfilar
+    from .reconciliacion import reconciliar
+    from .tenants import get_tenant, get_tenants, tarea_ventana, PAUSA_DESCARGAS
+    from .planificador import planificador
+    from .cola import ColaSQL
+    from .esquema import aplicar_migraciones, verificar_esquema
+    from .reportes import cache_reportes, consultar_resumen, parse_fecha_reporte
 except ImportError or ModuleNotFoundError:
     # Si se ejecuta desde raíz
     from api_client import api_client
-    from connection import get_connection
+    from connection import get_connection, PoolConexiones
     from procesamiento import procesar_datos
-    from utils import get_fechas_procesadas, get_fechas_procesadas_descargas
+    from utils import get_fechas_procesadas, get_fechas_procesadas_descargas, dividir_por_dia
+    from perfilado import debe_perfilar, obtener_perfil, perfilar
+    from reconciliacion import reconciliar
+    from tenants import get_tenant, get_tenants, tarea_ventana, PAUSA_DESCARGAS
+    from planificador import planificador
+    from cola import ColaSQL
+    from esquema import aplicar_migraciones, verificar_esquema
+    from reportes import cache_reportes, consultar_resumen, parse_fecha_reporte
 
 
 logging.basicConfig(level=logging.INFO)
 log = logging.getLogger(__name__)
 dotenv.load_dotenv()
-app = FastAPI()
+
+
+def modo_cola() -> bool:
+    """
+    Con MODO_COLA=true la API no procesa jobs: los encola en `trabajos_cola` para los workers (`python -m src.worker`).
+    Los de `/jobs/...` se encolan para el tenant `default` (ver TENANT_POR_DEFECTO).
+    """
+    return os.environ.get("MODO_COLA", "false").lower() == "true"
+
+
+# Tenant al que corresponden los jobs de `/jobs/...` (la base SQL_* y la API de BASE_URL) cuando se encolan
+TENANT_POR_DEFECTO = "default"
+
+
+# Cola en SQL Server para el modo con workers; no abre conexiones hasta usarse
+cola_trabajos = ColaSQL()
+
+
+def preparar_esquema():
+    """
+    Al iniciar: en la base de cada tenant aplica las migraciones si `ESQUEMA_AUTO_MIGRAR=true` y verifica
+    los índices de los MERGE. Se ejecuta en un hilo aparte para no demorar el arranque si alguna base tarda en responder.
+    """
+    auto_migrar = os.environ.get("ESQUEMA_AUTO_MIGRAR", "false").lower() == "true"
+    try:
+        tenants = get_tenants()
+    except Exception as e:
+        log.warning(f"No se pudo verificar el esquema al iniciar: {e}")
+        return
+    for tenant in tenants.values():
+        try:
+            with tenant.pool.conexion() as conexion:
+                if auto_migrar:
+                    aplicar_migraciones(conexion)
+                verificar_esquema(conexion, tenant.id)
+        except Exception as e:
+            log.warning(f"No se pudo verificar el esquema del tenant {tenant.id} al iniciar: {e}")
+
+
+def preparar_cola():
+    try:
+        cola_trabajos.preparar()
+    except Exception as e:
+        log.warning(f"No se pudo preparar trabajos_cola al iniciar: {e}")
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    if os.environ.get("ESQUEMA_VERIFICAR", "true").lower() == "true":
+        threading.Thread(target=preparar_esquema, name="verificar-esquema", daemon=True).start()
+    if modo_cola():
+        threading.Thread(target=preparar_cola, name="preparar-cola", daemon=True).start()
+    yield
+
+
+app = FastAPI(lifespan=lifespan)
+
+# Conexiones reutilizables para los endpoints de lectura (reportes)
+pool_lectura = PoolConexiones(tamanio=int(os.environ.get("POOL_LECTURA", "2")))
 
 Dia: TypeAlias = str
 
-@app.get("/")
-async def root(token: str = Query()):
+
+def verificar_token(token: str):
+    """Verifica que el token recibido coincida con TOKEN_AUTH. Lanza HTTPException si no."""
     token_auth = os.environ.get("TOKEN_AUTH")
     if not token_auth:
         log.error("TOKEN_AUTH no está configurado en variables de entorno")
@@ -39,94 +116,79 @@ async def root(token: str = Query()):
     if token != token_auth:
         log.warning("Token de autenticación inválido.")
         raise HTTPException(status_code=401, detail="No autorizado. Token inválido.")
+
+@app.get("/")
+async def root(token: str = Query()):
+    verificar_token(token)
     return {"message": "API de procesamiento de datos"}
 
 @app.get("/health")
 async def health_check(token: str = Query()):
-    token_auth = os.environ.get("TOKEN_AUTH")
-    if not token_auth:
-        log.error("TOKEN_AUTH no está configurado en variables de entorno")
-        raise HTTPException(status_code=500, detail="Error de configuración del servidor")
-    log.info("Verificando token de autenticación...")
-    if token != token_auth:
-        log.warning("Token de autenticación inválido.")
-        raise HTTPException(status_code=401, detail="No autorizado. Token inválido.")
+    verificar_token(token)
     if not token:
         raise HTTPException(status_code=400, detail="Falta el token de autenticación.")
     return {"status": "healthy", "timestamp": datetime.now().isoformat() + "Z"}
 
 @app.post("/jobs/ventas/{idTurno}")
 # baseURL/jobs/ventas/{idTurno}?token=xxxx
-async def ventas(
+# Los jobs son bloqueantes (requests + pyodbc): se definen con `def` para que FastAPI los corra en el
+# threadpool y no frenen el event loop (p. ej. /health). Ver benchmarks/load_api.py.
+def ventas(
     idTurno: int,
     token: str = Query(),
     fecha_desde: str | None = Query(None),
     fecha_hasta: str | None = Query(None),
+    profile: bool = Query(False),
 ):
+    job_id = uuid.uuid4().hex
+    perfilado = debe_perfilar(profile)
     try:
         # Verificamos que el token de autenticación sea correcto
-        token_auth = os.environ.get("TOKEN_AUTH")
-        if not token_auth:
-            log.error("TOKEN_AUTH no está configurado en variables de entorno")
-            raise HTTPException(status_code=500, detail="Error de configuración del servidor")
-        
-        log.info("Verificando token de autenticación...")
-        if token != token_auth:
-            log.warning("Token de autenticación inválido.")
-            raise HTTPException(status_code=401, detail="No autorizado. Token inválido.")
+        verificar_token(token)
 
-        log.info("Obteniendo token de autenticación a la API...")
-        token_api: str = api_client.get_token()
-        log.info("Token de API obtenido con éxito.")
-        
-        log.info("Conectando a la base de datos...")
-        conexion: Connection = get_connection()
-        log.info("Conexión a la base de datos exitosa.")
-        
-        fecha_desde, fecha_hasta = get_fechas_procesadas(idTurno, fecha_desde, fecha_hasta) #type: ignore
-        log.info(f"Procesando ventas para turno {idTurno} desde {fecha_desde} hasta {fecha_hasta}")
+        if modo_cola():
+            fecha_desde, fecha_hasta = get_fechas_procesadas(idTurno, fecha_desde, fecha_hasta) #type: ignore
+            return encolar_job_por_defecto("ventas", dividir_por_dia(fecha_desde, fecha_hasta)) #type: ignore
 
-        procesar_datos(token_api, fecha_desde, fecha_hasta, 'ventas', conexion) #type: ignore
-        
-        # Cerrar conexión
-        conexion.close()
+        with perfilar(job_id, perfilado) as perfil:
+            log.info("Obteniendo token de autenticación a la API...")
+            token_api: str = api_client.get_token()
+            log.info("Token de API obtenido con éxito.")
+
+            log.info("Conectando a la base de datos...")
+            conexion: Connection = get_connection()
+            log.info("Conexión a la base de datos exitosa.")
+
+            fecha_desde, fecha_hasta = get_fechas_procesadas(idTurno, fecha_desde, fecha_hasta) #type: ignore
+            log.info(f"Procesando ventas para turno {idTurno} desde {fecha_desde} hasta {fecha_hasta} (job {job_id})")
+
+            procesar_datos(token_api, fecha_desde, fecha_hasta, 'ventas', perfil.envolver(conexion) if perfil else conexion) #type: ignore
+
+            # Cerrar conexión
+            conexion.close()
         log.info("Proceso de ventas completado exitosamente")
-        
-        return {"status": "ok", "message": "proceso completado"}
+
+        return respuesta_job(job_id, perfilado)
     except HTTPException as http_exc:
         log.error(f"Error HTTP: {http_exc.detail}")
         raise
     except Exception as e:
-        log.error(f"Error inesperado: {str(e)}")
-        raise HTTPException(status_code=500, detail="Error interno del servidor")
+        log.error(f"Error inesperado (job {job_id}): {str(e)}")
+        raise HTTPException(status_code=500, detail=detalle_error_job(job_id, perfilado))
 
 @app.post("/jobs/descargas")
-async def descargas(
+def descargas(
     token: str = Query(),
     fecha_desde: str | None = Query(None),
-    fecha_hasta: str | None = Query(None)
+    fecha_hasta: str | None = Query(None),
+    profile: bool = Query(False),
 ):
-
+    job_id = uuid.uuid4().hex
+    perfilado = debe_perfilar(profile)
     try: 
         # Verificamos que el token de autenticación sea correcto
-        token_auth = os.environ.get("TOKEN_AUTH")
-        if not token_auth:
-            log.error("TOKEN_AUTH no está configurado en variables de entorno")
-            raise HTTPException(status_code=500, detail="Error de configuración del servidor")
-        
-        log.info("Verificando token de autenticación...")
-        if token != token_auth:
-            log.warning("Token de autenticación inválido.")
-            raise HTTPException(status_code=401, detail="No autorizado. Token inválido.")
+        verificar_token(token)
 
-        log.info("Obteniendo token de autenticación a la API...")
-        token_api: str = api_client.get_token()
-        log.info("Token de API obtenido con éxito.")
-        
-        log.info("Conectando a la base de datos...")
-        conexion: Connection = get_connection()
-        log.info("Conexión a la base de datos exitosa.")
-        
         if fecha_desde and fecha_hasta:
             # Lista de todos los dias pasados por parámetro de 00:00 a 23:59
             lista_fechas = get_fechas_procesadas_descargas(fecha_desde, fecha_hasta)
@@ -138,18 +200,286 @@ async def descargas(
         if not lista_fechas:
             log.warning("No hay fechas para procesar")
             return {"status": "ok", "message": "No hay fechas para procesar"}
-        
-        log.info(f"Procesando descargas desde {lista_fechas[0][0]} hasta {lista_fechas[-1][1]}")
-        # Iteramos sobre cada par desde hasta
-        for fecha_desde, fecha_hasta in lista_fechas: 
-            procesar_datos(token_api, fecha_desde, fecha_hasta, 'descargas', conexion)
-            time.sleep(2)
-        conexion.close()
+
+        if modo_cola():
+            return encolar_job_por_defecto("descargas", lista_fechas) #type: ignore
+
+        with perfilar(job_id, perfilado) as perfil:
+            log.info("Obteniendo token de autenticación a la API...")
+            token_api: str = api_client.get_token()
+            log.info("Token de API obtenido con éxito.")
+
+            log.info("Conectando a la base de datos...")
+            conexion: Connection = get_connection()
+            log.info("Conexión a la base de datos exitosa.")
+
+            log.info(f"Procesando descargas desde {lista_fechas[0][0]} hasta {lista_fechas[-1][1]} (job {job_id})")
+            # Iteramos sobre cada par desde hasta
+            for fecha_desde, fecha_hasta in lista_fechas: 
+                procesar_datos(token_api, fecha_desde, fecha_hasta, 'descargas', perfil.envolver(conexion) if perfil else conexion) #type: ignore
+                time.sleep(PAUSA_DESCARGAS)
+            conexion.close()
         log.info("Proceso de descargas completado exitosamente")
-        return {"status": "ok", "message": "proceso completado"}
+        return respuesta_job(job_id, perfilado)
     
     except HTTPException:
         raise  # Re-lanzar HTTPExceptions
     except Exception as e:
-        log.error(f"Error procesando descargas: {str(e)}")
-        raise HTTPException(status_code=500, detail="Error interno del servidor")
\ No newline at end of file
+        log.error(f"Error procesando descargas (job {job_id}): {str(e)}")
+        raise HTTPException(status_code=500, detail=detalle_error_job(job_id, perfilado))
+
+
+@app.post("/jobs/reconciliacion/{tabla}")
+# baseURL/jobs/reconciliacion/ventas?token=xxxx&fecha_desde=ddMMyyyyHHmm&fecha_hasta=ddMMyyyyHHmm
+def reconciliacion(
+    tabla: str,
+    token: str = Query(),
+    fecha_desde: str | None = Query(None),
+    fecha_hasta: str | None = Query(None),
+    por_turno: bool = Query(False),
+    solo_verificar: bool = Query(False),
+):
+    """
+    Compara agregados por día (o día y turno) entre la API y la base, y resincroniza solo los días que difieren.
+    Sin fechas usa los mismos últimos días que `/jobs/descargas`.
+    """
+    try:
+        verificar_token(token)
+        if tabla not in ("ventas", "descargas"):
+            raise HTTPException(status_code=400, detail="Tabla inválida. Use 'ventas' o 'descargas'.")
+
+        if fecha_desde and fecha_hasta:
+            lista_fechas = get_fechas_procesadas_descargas(fecha_desde, fecha_hasta)
+        else:
+            lista_fechas = get_fechas_procesadas(None, fecha_desde, fecha_hasta)
+
+        log.info("Obteniendo token de autenticación a la API...")
+        token_api: str = api_client.get_token()
+
+        log.info("Conectando a la base de datos...")
+        conexion: Connection = get_connection()
+
+        # Con MODO_COLA la API no procesa: solo verifica y encola las ventanas que difieren para los workers
+        encolar = modo_cola() and not solo_verificar
+        log.info(f"Reconciliando {tabla} en {len(lista_fechas)} días")
+        resultado = reconciliar(token_api, tabla, lista_fechas, conexion, por_turno, solo_verificar or encolar) #type: ignore
+        conexion.close()
+        if encolar and resultado["pendientes"]:
+            resultado["job"] = encolar_job_por_defecto(tabla, resultado["pendientes"])
+        return {"status": "ok", **resultado}
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        log.error(f"Error en reconciliación de {tabla}: {str(e)}")
+        raise HTTPException(status_code=500, detail="Error interno del servidor")
+
+
+@app.get("/tenants")
+async def tenants(token: str = Query()):
+    """Lista los tenants configurados."""
+    verificar_token(token)
+    return {"tenants": list(get_tenants())}
+
+
+@app.post("/tenants/{tenant_id}/jobs/ventas/{idTurno}")
+# baseURL/tenants/{tenant_id}/jobs/ventas/{idTurno}?token=xxxx
+async def ventas_tenant(
+    tenant_id: str,
+    idTurno: int,
+    token: str = Query(),
+    fecha_desde: str | None = Query(None),
+    fecha_hasta: str | None = Query(None),
+):
+    """Encola la sincronización de ventas de un turno para un tenant. Retorna el job para consultar su estado."""
+    verificar_token(token)
+    tenant = get_tenant(tenant_id)
+    if tenant is None:
+        raise HTTPException(status_code=404, detail="Tenant no encontrado.")
+    try:
+        fecha_desde, fecha_hasta = get_fechas_procesadas(idTurno, fecha_desde, fecha_hasta) #type: ignore
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    # Un rango de varios días se divide en ventanas diarias para repartirlas entre workers
+    return await run_in_threadpool(encolar_job, tenant, "ventas", dividir_por_dia(fecha_desde, fecha_hasta)) #type: ignore
+
+
+@app.post("/tenants/{tenant_id}/jobs/descargas")
+async def descargas_tenant(
+    tenant_id: str,
+    token: str = Query(),
+    fecha_desde: str | None = Query(None),
+    fecha_hasta: str | None = Query(None),
+):
+    """Encola la sincronización de descargas de un tenant, una ventana por día."""
+    verificar_token(token)
+    tenant = get_tenant(tenant_id)
+    if tenant is None:
+        raise HTTPException(status_code=404, detail="Tenant no encontrado.")
+    try:
+        if fecha_desde and fecha_hasta:
+            lista_fechas = get_fechas_procesadas_descargas(fecha_desde, fecha_hasta)
+        else:
+            lista_fechas = get_fechas_procesadas(None, fecha_desde, fecha_hasta)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    return await run_in_threadpool(encolar_job, tenant, "descargas", lista_fechas) #type: ignore
+
+
+@app.post("/tenants/{tenant_id}/jobs/reconciliacion/{tabla}")
+# baseURL/tenants/{tenant_id}/jobs/reconciliacion/ventas?token=xxxx&fecha_desde=ddMMyyyyHHmm&fecha_hasta=ddMMyyyyHHmm
+def reconciliacion_tenant(
+    tenant_id: str,
+    tabla: str,
+    token: str = Query(),
+    fecha_desde: str | None = Query(None),
+    fecha_hasta: str | None = Query(None),
+    por_turno: bool = Query(False),
+    solo_verificar: bool = Query(False),
+):
+    """
+    Como `/jobs/reconciliacion/{tabla}` pero contra la API y la base de un tenant. Como los demás jobs de tenants
+    no procesa en la API: las ventanas que difieren se encolan (en `trabajos_cola` con MODO_COLA) y se informa el job.
+    """
+    verificar_token(token)
+    tenant = get_tenant(tenant_id)
+    if tenant is None:
+        raise HTTPException(status_code=404, detail="Tenant no encontrado.")
+    if tabla not in ("ventas", "descargas"):
+        raise HTTPException(status_code=400, detail="Tabla inválida. Use 'ventas' o 'descargas'.")
+    try:
+        if fecha_desde and fecha_hasta:
+            lista_fechas = get_fechas_procesadas_descargas(fecha_desde, fecha_hasta)
+        else:
+            lista_fechas = get_fechas_procesadas(None, fecha_desde, fecha_hasta)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    try:
+        token_api = tenant.api.token()
+        log.info(f"Reconciliando {tabla} del tenant {tenant.id} en {len(lista_fechas)} días")
+        with tenant.pool.conexion() as conexion:
+            resultado = reconciliar(token_api, tabla, lista_fechas, conexion, por_turno, True, cliente=tenant.api) #type: ignore
+    except Exception as e:
+        log.error(f"Error en reconciliación de {tabla} del tenant {tenant.id}: {str(e)}")
+        raise HTTPException(status_code=500, detail="Error interno del servidor")
+
+    if not solo_verificar and resultado["pendientes"]:
+        resultado["job"] = encolar_job(tenant, tabla, resultado["pendientes"])
+    return {"status": "ok", "tenant": tenant.id, **resultado}
+
+
+@app.get("/tenants/{tenant_id}/jobs/{job_id}")
+async def estado_job_tenant(tenant_id: str, job_id: str, token: str = Query()):
+    """Estado de un job encolado de un tenant."""
+    verificar_token(token)
+    if modo_cola():
+        estado = await run_in_threadpool(cola_trabajos.estado_job, job_id)
+    else:
+        trabajo = planificador.obtener(job_id)
+        estado = trabajo.como_dict() if trabajo else None
+    if estado is None or estado["tenant"] != tenant_id:
+        raise HTTPException(status_code=404, detail="Job no encontrado.")
+    return estado
+
+
+def encolar_job(tenant, tabla: str, ventanas: list[tuple[str, str]]) -> dict:
+    """Encola las ventanas de un job en `trabajos_cola` (MODO_COLA) o en el planificador en proceso. Es bloqueante."""
+    if modo_cola():
+        try:
+            job_id = cola_trabajos.encolar(tenant.id, tabla, ventanas)
+        except Exception as e:
+            log.error(f"Error encolando job de {tabla}: {str(e)}")
+            raise HTTPException(status_code=500, detail="Error interno del servidor")
+        return {"status": "encolado", "job_id": job_id, "tenant": tenant.id, "tipo": tabla, "ventanas": len(ventanas)}
+
+    tareas = [tarea_ventana(tenant, tabla, desde, hasta) for desde, hasta in ventanas]
+    trabajo = planificador.encolar(tenant.id, tabla, tareas, tenant.max_concurrencia)
+    return {"status": "encolado", **trabajo.como_dict()}
+
+
+def encolar_job_por_defecto(tabla: str, ventanas: list[tuple[str, str]]) -> dict:
+    """
+    Con MODO_COLA, `/jobs/ventas` y `/jobs/descargas` también solo encolan, para el tenant `default`.
+    El estado se consulta en `/tenants/default/jobs/{job_id}`.
+    """
+    tenant = get_tenant(TENANT_POR_DEFECTO)
+    if tenant is None:
+        log.error(f"MODO_COLA requiere un tenant '{TENANT_POR_DEFECTO}' para encolar los jobs de /jobs/{tabla}")
+        raise HTTPException(status_code=500, detail="Error de configuración del servidor")
+    respuesta = encolar_job(tenant, tabla, ventanas)
+    respuesta["estado_url"] = f"/tenants/{tenant.id}/jobs/{respuesta['job_id']}"
+    return respuesta
+
+
+@app.get("/reports/ventas")
+# baseURL/reports/ventas?token=xxxx&fecha_desde=ddMMyyyy&fecha_hasta=ddMMyyyy
+async def reporte_ventas(
+    token: str = Query(),
+    fecha_desde: str = Query(),
+    fecha_hasta: str = Query(),
+    idTurno: int | None = Query(None),
+    lugarDeVentaId: int | None = Query(None),
+    formaDePagoId: int | None = Query(None),
+    tenant: str | None = Query(None),
+):
+    """
+    Totales de ventas por (fecha, idTurno, lugarDeVentaId, formaDePagoId) desde `ventas_resumen`.
+    Las respuestas se sirven desde una cache en memoria durante REPORTES_CACHE_TTL segundos.
+    """
+    verificar_token(token)
+    try:
+        desde, hasta = parse_fecha_reporte(fecha_desde), parse_fecha_reporte(fecha_hasta)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    clave = (tenant, desde, hasta, idTurno, lugarDeVentaId, formaDePagoId)
+    reporte = cache_reportes.obtener(clave)
+    if reporte is not None:
+        return reporte
+
+    pool = pool_lectura
+    if tenant is not None:
+        tenant_obj = get_tenant(tenant)
+        if tenant_obj is None:
+            raise HTTPException(status_code=404, detail="Tenant no encontrado.")
+        pool = tenant_obj.pool
+
+    def consultar():
+        with pool.conexion() as conexion:
+            return consultar_resumen(conexion, desde, hasta, idTurno, lugarDeVentaId, formaDePagoId)
+
+    try:
+        reporte = await run_in_threadpool(consultar)
+    except Exception as e:
+        log.error(f"Error consultando reporte de ventas: {str(e)}")
+        raise HTTPException(status_code=500, detail="Error interno del servidor")
+    cache_reportes.guardar(clave, reporte)
+    return reporte
+
+
+@app.get("/jobs/perfiles/{job_id}")
+async def perfil_job(job_id: str, token: str = Query()):
+    """Retorna el perfil (CPU + traza SQL) de un job ejecutado con `?profile=true` o muestreado."""
+    verificar_token(token)
+    perfil = obtener_perfil(job_id)
+    if perfil is None:
+        raise HTTPException(status_code=404, detail="No hay perfil para ese job.")
+    return perfil
+
+
+def respuesta_job(job_id: str, perfilado: bool) -> dict:
+    """Respuesta estándar de un job; si fue perfilado incluye dónde consultar el perfil."""
+    respuesta = {"status": "ok", "message": "proceso completado", "job_id": job_id}
+    if perfilado:
+        respuesta["perfil"] = f"/jobs/perfiles/{job_id}"
+    return respuesta
+
+
+def detalle_error_job(job_id: str, perfilado: bool) -> str:
+    """Detalle del error 500 de un job; si fue perfilado incluye el `job_id` para poder consultar su perfil."""
+    if perfilado:
+        return f"Error interno del servidor (job {job_id}, perfil en /jobs/perfiles/{job_id})"
+    return "Error interno del servidor"
@@ -0,0 +1,262 @@
+import cProfile
+import io
+import json
+import logging
+import os
+import pstats
+import random
+import re
+import tempfile
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from pyodbc import Connection, Cursor
+
+
+log = logging.getLogger(__name__)
+
+PROFILE_DIR = os.environ.get("PROFILE_DIR", os.path.join(tempfile.gettempdir(), "debo_perfiles"))
+
+# Cantidad de funciones que se guardan en el resumen del perfil de CPU
+TOP_FUNCIONES = 40
+
+
+def _leer_tasa_muestreo() -> float:
+    """Lee `PROFILE_SAMPLE_RATE`. Un valor inválido no debe hacer fallar los jobs: se usa 0 y se avisa."""
+    valor = os.environ.get("PROFILE_SAMPLE_RATE", "0") or "0"
+    try:
+        return float(valor)
+    except ValueError:
+        log.warning(f"PROFILE_SAMPLE_RATE inválido ({valor!r}), no se perfilan jobs por muestreo")
+        return 0.0
+
+
+# Fracción de jobs que se perfilan por muestreo (0 a 1)
+PROFILE_SAMPLE_RATE = _leer_tasa_muestreo()
+
+
+def _leer_limite(nombre: str, defecto: int) -> int:
+    """Lee un límite entero de retención de perfiles. Un valor inválido usa `defecto` y se avisa; 0 desactiva el límite."""
+    valor = os.environ.get(nombre, str(defecto)) or str(defecto)
+    try:
+        return max(0, int(valor))
+    except ValueError:
+        log.warning(f"{nombre} inválido ({valor!r}), se usa {defecto}")
+        return defecto
+
+
+# Retención de PROFILE_DIR: cantidad máxima de perfiles guardados y antigüedad máxima en días (0 = sin límite)
+PROFILE_MAX_ARCHIVOS = _leer_limite("PROFILE_MAX_ARCHIVOS", 200)
+PROFILE_MAX_DIAS = _leer_limite("PROFILE_MAX_DIAS", 7)
+
+
+def debe_perfilar(profile: bool) -> bool:
+    """
+    Indica si un job se debe perfilar: por pedido explícito (`?profile=true`)
+    o por muestreo según `PROFILE_SAMPLE_RATE` (0 a 1, por defecto 0).
+    """
+    if profile:
+        return True
+    return PROFILE_SAMPLE_RATE > 0 and random.random() < PROFILE_SAMPLE_RATE
+
+
+def _contar_parametros(params: tuple) -> int:
+    """`cursor.execute(query, (a, b))` y `cursor.execute(query, a, b)` son equivalentes en pyodbc."""
+    if len(params) == 1 and isinstance(params[0], (tuple, list)):
+        return len(params[0])
+    return len(params)
+
+
+class CursorPerfilado:
+    """Envuelve un cursor de pyodbc y registra latencia, parámetros y round trips de cada sentencia."""
+
+    def __init__(self, cursor: Cursor, perfil: "Perfil"):
+        self._cursor = cursor
+        self._perfil = perfil
+
+    def execute(self, query: str, *params):
+        inicio = time.perf_counter()
+        try:
+            self._cursor.execute(query, *params)
+        finally:
+            self._perfil.registrar_sentencia(query, _contar_parametros(params), time.perf_counter() - inicio)
+        return self
+
+    def fetchone(self):
+        return self._perfil.medir_round_trip(self._cursor.fetchone)
+
+    def fetchall(self):
+        return self._perfil.medir_round_trip(self._cursor.fetchall)
+
+    def fetchmany(self, *args):
+        return self._perfil.medir_round_trip(self._cursor.fetchmany, *args)
+
+    def __getattr__(self, nombre):
+        return getattr(self._cursor, nombre)
+
+
+class ConexionPerfilada:
+    """Envuelve una conexión de pyodbc para que sus cursores queden perfilados."""
+
+    def __init__(self, conexion: Connection, perfil: "Perfil"):
+        self._conexion = conexion
+        self._perfil = perfil
+
+    def cursor(self) -> CursorPerfilado:
+        return CursorPerfilado(self._conexion.cursor(), self._perfil)
+
+    def commit(self):
+        return self._perfil.medir_round_trip(self._conexion.commit)
+
+    def rollback(self):
+        return self._perfil.medir_round_trip(self._conexion.rollback)
+
+    def __getattr__(self, nombre):
+        return getattr(self._conexion, nombre)
+
+
+class Perfil:
+    """Perfil de CPU (cProfile) más traza de SQL de un job."""
+
+    def __init__(self, job_id: str):
+        self.job_id = job_id
+        self.inicio = datetime.now()
+        self.sentencias: list[dict] = []
+        self.round_trips = 0
+        self.segundos_sql = 0.0
+        self._profiler: cProfile.Profile | None = cProfile.Profile()
+        self._t0 = time.perf_counter()
+        self.duracion = 0.0
+
+    def envolver(self, conexion: Connection) -> ConexionPerfilada:
+        return ConexionPerfilada(conexion, self)
+
+    def registrar_sentencia(self, query: str, parametros: int, segundos: float):
+        self.round_trips += 1
+        self.segundos_sql += segundos
+        self.sentencias.append({
+            "sql": re.sub(r"\s+", " ", query).strip()[:300],
+            "parametros": parametros,
+            "ms": round(segundos * 1000, 3),
+        })
+
+    def medir_round_trip(self, funcion, *args):
+        inicio = time.perf_counter()
+        try:
+            return funcion(*args)
+        finally:
+            self.round_trips += 1
+            self.segundos_sql += time.perf_counter() - inicio
+
+    def iniciar(self):
+        try:
+            self._profiler.enable()  # type: ignore
+        except ValueError:
+            # Solo puede haber un profiler activo a la vez; seguimos solo con la traza SQL
+            log.warning(f"No se pudo iniciar el perfil de CPU del job {self.job_id}: ya hay otro activo")
+            self._profiler = None
+
+    def detener(self):
+        self.duracion = time.perf_counter() - self._t0
+        if self._profiler:
+            self._profiler.disable()
+
+    def guardar(self) -> str:
+        """Guarda `{job_id}.json` (resumen + traza SQL) y `{job_id}.prof` (pstats) en PROFILE_DIR."""
+        os.makedirs(PROFILE_DIR, exist_ok=True)
+        funciones = ""
+        if self._profiler:
+            self._profiler.dump_stats(os.path.join(PROFILE_DIR, f"{self.job_id}.prof"))
+            salida = io.StringIO()
+            pstats.Stats(self._profiler, stream=salida).sort_stats("cumulative").print_stats(TOP_FUNCIONES)
+            funciones = salida.getvalue()
+
+        artefacto = {
+            "job_id": self.job_id,
+            "inicio": self.inicio.isoformat(),
+            "duracion_s": round(self.duracion, 3),
+            "sql": {
+                "sentencias": len(self.sentencias),
+                "round_trips": self.round_trips,
+                "tiempo_s": round(self.segundos_sql, 3),
+                "parametros": sum(s["parametros"] for s in self.sentencias),
+                "traza": self.sentencias,
+            },
+            "cpu": funciones,
+        }
+        ruta = os.path.join(PROFILE_DIR, f"{self.job_id}.json")
+        with open(ruta, "w", encoding="utf-8") as archivo:
+            json.dump(artefacto, archivo, ensure_ascii=False)
+        log.info(f"Perfil del job {self.job_id} guardado en {ruta}")
+        limpiar_perfiles()
+        return ruta
+
+
+def limpiar_perfiles():
+    """
+    Aplica la retención de PROFILE_DIR: borra los perfiles (`.json` y `.prof` del mismo job) más antiguos
+    que PROFILE_MAX_DIAS y, de los restantes, los más viejos que excedan PROFILE_MAX_ARCHIVOS.
+    Un error al borrar se registra y no hace fallar el job.
+    """
+    try:
+        nombres = os.listdir(PROFILE_DIR)
+    except OSError:
+        return
+
+    # job_id -> fecha de modificación más reciente de sus archivos
+    perfiles: dict[str, float] = {}
+    for nombre in nombres:
+        job_id, extension = os.path.splitext(nombre)
+        if extension not in (".json", ".prof"):
+            continue
+        try:
+            modificado = os.path.getmtime(os.path.join(PROFILE_DIR, nombre))
+        except OSError:
+            continue
+        perfiles[job_id] = max(modificado, perfiles.get(job_id, 0.0))
+
+    ordenados = sorted(perfiles, key=perfiles.__getitem__, reverse=True)
+    limite_fecha = time.time() - PROFILE_MAX_DIAS * 86400
+    borrar = [
+        job_id for n, job_id in enumerate(ordenados)
+        if (PROFILE_MAX_ARCHIVOS and n >= PROFILE_MAX_ARCHIVOS) or (PROFILE_MAX_DIAS and perfiles[job_id] < limite_fecha)
+    ]
+    for job_id in borrar:
+        for extension in (".json", ".prof"):
+            ruta = os.path.join(PROFILE_DIR, f"{job_id}{extension}")
+            try:
+                if os.path.exists(ruta):
+                    os.remove(ruta)
+            except OSError as e:
+                log.warning(f"No se pudo borrar el perfil {ruta}: {e}")
+    if borrar:
+        log.info(f"Retención de perfiles: {len(borrar)} perfiles borrados de {PROFILE_DIR}")
+
+
+@contextmanager
+def perfilar(job_id: str, activo: bool):
+    """
+    Context manager que perfila el bloque si `activo` es True y guarda el artefacto al salir.
+    Si no está activo devuelve None y no agrega ningún costo.
+    """
+    if not activo:
+        yield None
+        return
+    perfil = Perfil(job_id)
+    perfil.iniciar()
+    try:
+        yield perfil
+    finally:
+        perfil.detener()
+        perfil.guardar()
+
+
+def obtener_perfil(job_id: str) -> dict | None:
+    """Retorna el artefacto de perfil guardado para un job, o None si no existe."""
+    if not re.fullmatch(r"[0-9a-fA-F-]+", job_id):
+        return None
+    ruta = os.path.join(PROFILE_DIR, f"{job_id}.json")
+    if not os.path.exists(ruta):
+        return None
+    with open(ruta, encoding="utf-8") as archivo:
+        return json.load(archivo)
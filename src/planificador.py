@@ -0,0 +1,142 @@
+import logging
+import os
+import threading
+import uuid
+from collections import deque
+from datetime import datetime
+from typing import Callable
+
+
+log = logging.getLogger(__name__)
+
+# Cantidad de trabajos terminados que se conservan para consultar su estado
+MAX_HISTORIAL = 1000
+
+
+class Trabajo:
+    """Un job encolado de un tenant, dividido en ventanas (tareas) independientes."""
+
+    def __init__(self, tenant_id: str, tipo: str, total: int):
+        self.id = uuid.uuid4().hex
+        self.tenant_id = tenant_id
+        self.tipo = tipo
+        self.creado = datetime.now()
+        self.estado = "pendiente"
+        self.total = total
+        self.completadas = 0
+        self.errores: list[str] = []
+
+    @property
+    def terminado(self) -> bool:
+        return self.completadas + len(self.errores) >= self.total
+
+    def como_dict(self) -> dict:
+        return {
+            "job_id": self.id,
+            "tenant": self.tenant_id,
+            "tipo": self.tipo,
+            "creado": self.creado.isoformat(),
+            "estado": self.estado,
+            "ventanas": self.total,
+            "completadas": self.completadas,
+            "errores": self.errores,
+        }
+
+
+class Planificador:
+    """
+    Ejecuta las tareas de todos los tenants con un presupuesto global de `max_workers` hilos.
+    Cada tenant tiene su propia cola y los workers las recorren en round robin, tomando una
+    tarea por vez, así un tenant con muchas ventanas no deja sin turno a los demás.
+    Cada tenant además tiene un máximo de tareas en curso (`max_concurrencia`), normalmente
+    el tamaño de su pool de conexiones.
+    """
+
+    def __init__(self, max_workers: int):
+        self.max_workers = max_workers
+        self._cond = threading.Condition()
+        self._colas: dict[str, deque[tuple[Trabajo, Callable[[], None]]]] = {}
+        self._en_curso: dict[str, int] = {}
+        self._max_concurrencia: dict[str, int] = {}
+        self._orden: list[str] = []
+        self._proximo = 0
+        self._trabajos: dict[str, Trabajo] = {}
+        self._hilos: list[threading.Thread] = []
+
+    def encolar(self, tenant_id: str, tipo: str, tareas: list[Callable[[], None]], max_concurrencia: int = 1) -> Trabajo:
+        """Encola las tareas de un job de un tenant y retorna el `Trabajo` para seguir su estado."""
+        trabajo = Trabajo(tenant_id, tipo, len(tareas))
+        with self._cond:
+            if tenant_id not in self._colas:
+                self._colas[tenant_id] = deque()
+                self._en_curso[tenant_id] = 0
+                self._orden.append(tenant_id)
+            self._max_concurrencia[tenant_id] = max(1, max_concurrencia)
+            self._colas[tenant_id].extend((trabajo, tarea) for tarea in tareas)
+            self._trabajos[trabajo.id] = trabajo
+            self._podar_historial()
+            if not tareas:
+                trabajo.estado = "ok"
+            self._iniciar_hilos()
+            self._cond.notify_all()
+        log.info(f"Job {trabajo.id} ({tipo}) del tenant {tenant_id} encolado con {len(tareas)} ventanas")
+        return trabajo
+
+    def obtener(self, job_id: str) -> Trabajo | None:
+        with self._cond:
+            return self._trabajos.get(job_id)
+
+    def _iniciar_hilos(self):
+        while len(self._hilos) < self.max_workers:
+            hilo = threading.Thread(target=self._worker, name=f"planificador-{len(self._hilos)}", daemon=True)
+            self._hilos.append(hilo)
+            hilo.start()
+
+    def _podar_historial(self):
+        terminados = [j for j in self._trabajos.values() if j.terminado]
+        for trabajo in terminados[:max(0, len(self._trabajos) - MAX_HISTORIAL)]:
+            del self._trabajos[trabajo.id]
+
+    def _siguiente(self) -> tuple[str, Trabajo, Callable[[], None]] | None:
+        """Próxima tarea en round robin entre tenants con tareas pendientes y cupo libre. Requiere el lock."""
+        n = len(self._orden)
+        for i in range(n):
+            tenant_id = self._orden[(self._proximo + i) % n]
+            cola = self._colas[tenant_id]
+            if cola and self._en_curso[tenant_id] < self._max_concurrencia[tenant_id]:
+                self._proximo = (self._proximo + i + 1) % n
+                trabajo, tarea = cola.popleft()
+                self._en_curso[tenant_id] += 1
+                return tenant_id, trabajo, tarea
+        return None
+
+    def _worker(self):
+        while True:
+            with self._cond:
+                siguiente = self._siguiente()
+                while siguiente is None:
+                    self._cond.wait()
+                    siguiente = self._siguiente()
+                tenant_id, trabajo, tarea = siguiente
+                trabajo.estado = "en_curso"
+
+            error = None
+            try:
+                tarea()
+            except Exception as e:
+                log.error(f"Error en job {trabajo.id} del tenant {tenant_id}: {e}")
+                error = str(e)
+
+            with self._cond:
+                self._en_curso[tenant_id] -= 1
+                if error is None:
+                    trabajo.completadas += 1
+                else:
+                    trabajo.errores.append(error)
+                if trabajo.terminado:
+                    trabajo.estado = "error" if trabajo.errores else "ok"
+                    log.info(f"Job {trabajo.id} del tenant {tenant_id} terminado: {trabajo.estado}")
+                self._cond.notify_all()
+
+
+planificador = Planificador(int(os.environ.get("WORKERS_GLOBALES", "4")))
@@ -1,20 +1,99 @@
-from pyodbc import Connection, Cursor
+from pyodbc import Connection, Cursor, InterfaceError, OperationalError
 import logging
+import os
+import threading
+import time
 
 try:
     # Si está en src/
     from api_client import api_client
-    from insertar_datos import insertar
+    from connection import clave_base, es_error_transitorio
+    from insertar_datos import insertar, DDL_VENTAS_RESUMEN
+    from dimensiones import dimensiones, separar_dimensiones
+    from utils import parse_dia
 except ImportError or ModuleNotFoundError:
     # Si se ejecuta desde raíz
     from src.api_client import api_client
-    from src.insertar_datos import insertar
+    from src.connection import clave_base, es_error_transitorio
+    from src.insertar_datos import insertar, DDL_VENTAS_RESUMEN
+    from src.dimensiones import dimensiones, separar_dimensiones
+    from src.utils import parse_dia
 
 
 log = logging.getLogger(__name__)
 
-def procesar_datos(token: str, fecha_desde: str, fecha_hasta: str, tabla: str, conexion: Connection):
-    """Procesa los datos obtenidos de la API y los inserta en la base de datos."""
+# Bases (servidor, base) en las que ya se crearon las tablas de dimensión y `ventas_resumen`.
+# Son por base y no por proceso porque un mismo proceso escribe en las bases de varios tenants.
+_esquema_dimensiones_creado: set[tuple] = set()
+_tabla_resumen_creada: set[tuple] = set()
+
+
+# Reintentos de un lote de ventas ante un error transitorio (deadlock, timeout) antes de relanzarlo
+REINTENTOS_TRANSITORIOS = 3
+PAUSA_REINTENTO_TRANSITORIO = 1.0
+
+
+class ProcesoCancelado(Exception):
+    """Se pidió cancelar el procesamiento (p. ej. el worker perdió el lease de la ventana y otro la va a procesar)."""
+
+
+def _verificar_cancelado(cancelado: threading.Event | None, donde: str):
+    if cancelado is not None and cancelado.is_set():
+        raise ProcesoCancelado(f"Procesamiento cancelado {donde}")
+
+
+def modo_normalizado() -> bool:
+    """Indica si las ventas se escriben normalizadas (solo FKs en `ventas` + tablas de dimensión)."""
+    return os.environ.get("VENTAS_MODO_NORMALIZADO", "false").lower() in ("1", "true", "si")
+
+
+def preparar_esquema_dimensiones(conexion: Connection, cursor: Cursor, base: tuple):
+    """Crea las tablas de dimensión y la vista de compatibilidad una sola vez por base."""
+    if base in _esquema_dimensiones_creado:
+        return
+    dimensiones.crear_esquema(cursor)
+    conexion.commit()
+    _esquema_dimensiones_creado.add(base)
+
+
+def modo_resumen() -> bool:
+    """Indica si se mantiene `ventas_resumen` con cada lote de ventas (VENTAS_RESUMEN, activo por defecto)."""
+    return os.environ.get("VENTAS_RESUMEN", "true").lower() in ("1", "true", "si")
+
+
+def preparar_tabla_resumen(conexion: Connection, cursor: Cursor, base: tuple) -> bool:
+    """
+    Crea `ventas_resumen` si no existe, una sola vez por base.
+    Si no se puede (p. ej. sin permisos de DDL) retorna False y las ventas se procesan sin resumen,
+    para que un problema del resumen no haga fallar los lotes.
+    """
+    if base in _tabla_resumen_creada:
+        return True
+    try:
+        cursor.execute(f"IF OBJECT_ID('ventas_resumen', 'U') IS NULL {DDL_VENTAS_RESUMEN}")
+        conexion.commit()
+    except Exception as e:
+        conexion.rollback()
+        log.warning(f"No se pudo preparar ventas_resumen, se procesa sin resumen: {e}")
+        return False
+    _tabla_resumen_creada.add(base)
+    return True
+
+def procesar_datos(
+    token: str,
+    fecha_desde: str,
+    fecha_hasta: str,
+    tabla: str,
+    conexion: Connection,
+    datos: list | None = None,
+    cancelado: threading.Event | None = None,
+):
+    """
+    Procesa los datos obtenidos de la API y los inserta en la base de datos.
+    Si se pasa `datos` (respuesta de la API ya obtenida para esa ventana) no se vuelve a consultar la API.
+    Si se pasa `cancelado`, se revisa antes de cada lote (y antes del commit de descargas): si está seteado
+    se lanza ProcesoCancelado sin escribir nada más. Los lotes ya commiteados quedan.
+    """
     cursor: Cursor = conexion.cursor()
 
     match tabla:
@@ -22,42 +101,58 @@ def procesar_datos(token: str, fecha_desde: str, fecha_hasta: str, tabla: str, c
         case 'ventas':
             log.info("Procesando datos para las tablas de ventas...")
             log.info("Obteniendo datos de ventas desde la API...")
-            ventas = api_client.get_ventas(token, fecha_desde, fecha_hasta)
+            ventas = datos if datos is not None else api_client.get_ventas(token, fecha_desde, fecha_hasta)
             log.info(f"Datos obtenidos. {len(ventas)} ventas a procesar...")
-            
+
+            base = clave_base(conexion)
+            normalizado = modo_normalizado()
+            if normalizado:
+                preparar_esquema_dimensiones(conexion, cursor, base)
+            resumen = modo_resumen() and preparar_tabla_resumen(conexion, cursor, base)
+
             # Preparar todas las ventas formateadas
             ventas_formateadas = []
             for venta in ventas:
                 data_ventas, data_ventas_cuerpo, data_ventas_formaspago_detalle = formatear_json_venta(venta)
+                data_dimensiones = {}
+                if normalizado:
+                    data_ventas, data_dimensiones = separar_dimensiones(data_ventas)
                 ventas_formateadas.append({
                     'data': data_ventas,
                     'data_cuerpo': data_ventas_cuerpo,
-                    'data_formaspago': data_ventas_formaspago_detalle
+                    'data_formaspago': data_ventas_formaspago_detalle,
+                    'data_dimensiones': data_dimensiones,
+                    'original': venta
                 })
             
             # Procesar en lotes para mejor rendimiento y manejo de memoria
             TAMANIO_LOTE = 500
             total_ventas = len(ventas_formateadas)
+            total_fallidas = 0
 
             for i in range(0, total_ventas, TAMANIO_LOTE): # para cada lote
                 lote = ventas_formateadas[i:i+TAMANIO_LOTE] # obtener la sublista del lote
+                _verificar_cancelado(cancelado, f"antes del lote {i//TAMANIO_LOTE + 1} de ventas")
                 log.info(f"Procesando lote {i//TAMANIO_LOTE + 1} ({i+1}-{min(i+TAMANIO_LOTE, total_ventas)} de {total_ventas} ventas)...") 
                 
-                try:
-                    insertar.ventas_bulk(lote, cursor)
-                    conexion.commit()
+                fallidas = insertar_lote_ventas(lote, conexion, cursor, normalizado, base)
+                if fallidas:
+                    log.warning(f"Lote {i//TAMANIO_LOTE + 1} insertado con {fallidas} ventas enviadas a ventas_dead_letter")
+                else:
                     log.info(f"Lote {i//TAMANIO_LOTE + 1} insertado exitosamente")
-                except Exception as e:
-                    log.error(f"Error procesando lote {i//TAMANIO_LOTE + 1}: {e}")
-                    conexion.rollback()
-                    raise
+                total_fallidas += fallidas
+                if resumen:
+                    actualizar_resumen(lote, conexion, cursor)
 
-            log.info("Datos de ventas procesados e insertados en las tablas de ventas con éxito")
+            if total_fallidas:
+                log.warning(f"Datos de ventas procesados: {total_fallidas} de {total_ventas} ventas enviadas a ventas_dead_letter")
+            else:
+                log.info("Datos de ventas procesados e insertados en las tablas de ventas con éxito")
 
         case 'descargas':
             log.info(f"Procesando datos para la tabla de descargas en {fecha_desde} a {fecha_hasta}")
             log.info("Obteniendo datos de descargas desde la API...")
-            descargas = api_client.get_compras(token, fecha_desde, fecha_hasta)
+            descargas = datos if datos is not None else api_client.get_compras(token, fecha_desde, fecha_hasta)
             log.info("Datos obtenidos. Cargando datos a base de datos...")
             
             for remito in descargas:
@@ -65,7 +160,10 @@ def procesar_datos(token: str, fecha_desde: str, fecha_hasta: str, tabla: str, c
                 if data_descargas_comb: # si no es remito de combustible, no hacemos nada
                     for item in data_descargas_comb: # por cada dict cuerpo de combustible
                         insertar.descargas(item, cursor)
-            
+
+            if cancelado is not None and cancelado.is_set():
+                conexion.rollback()
+                _verificar_cancelado(cancelado, "antes del commit de descargas")
             conexion.commit()
             log.info("Datos insertados en la tabla de descargas con éxito.")
 
@@ -76,6 +174,71 @@ def procesar_datos(token: str, fecha_desde: str, fecha_hasta: str, tabla: str, c
     cursor.close()
 
 
+def insertar_lote_ventas(lote: list[dict], conexion: Connection, cursor: Cursor, normalizado: bool, base: tuple = (), intento: int = 0) -> int:
+    """
+    Inserta y commitea un lote de ventas. Si falla, hace rollback y lo divide en dos mitades
+    que se reintentan por separado, recursivamente, hasta aislar las ventas que fallan solas.
+    Esas ventas se guardan en `ventas_dead_letter` con el error y el JSON original; el resto se commitea.
+    Si tampoco se puede guardar en `ventas_dead_letter` se loguea y el job sigue.
+
+    `base` identifica la base de `conexion` para la cache de dimensiones (ver `clave_base`).
+    Los errores de conexión (OperationalError, InterfaceError) no se bisectan: se relanzan.
+    Los transitorios (deadlock, timeout; ver `es_error_transitorio`) tampoco: el mismo lote se reintenta
+    hasta REINTENTOS_TRANSITORIOS veces y después se relanza el error.
+    Retorna la cantidad de ventas enviadas a `ventas_dead_letter`.
+    """
+    try:
+        pendientes = dimensiones.upsert([v['data_dimensiones'] for v in lote], cursor, base) if normalizado else []
+        insertar.ventas_bulk(lote, cursor)
+        conexion.commit()
+        dimensiones.confirmar(pendientes)
+        return 0
+    except (OperationalError, InterfaceError):
+        conexion.rollback()
+        raise
+    except Exception as e:
+        conexion.rollback()
+        if es_error_transitorio(e):
+            if intento >= REINTENTOS_TRANSITORIOS:
+                raise
+            log.warning(f"Error transitorio en lote de {len(lote)} ventas, reintento {intento + 1}/{REINTENTOS_TRANSITORIOS}: {e}")
+            time.sleep(PAUSA_REINTENTO_TRANSITORIO * (intento + 1))
+            return insertar_lote_ventas(lote, conexion, cursor, normalizado, base, intento + 1)
+        if len(lote) == 1:
+            data = lote[0]['data']
+            clave = f"{data.get('letra')}-{data.get('tipo')}-{data.get('sucursal')}-{data.get('numero')}"
+            log.error(f"Venta {clave} enviada a ventas_dead_letter: {e}")
+            try:
+                insertar.venta_dead_letter(data, str(e), cursor, json_original=lote[0].get('original'))
+                conexion.commit()
+            except Exception as e_dead_letter:
+                conexion.rollback()
+                if isinstance(e_dead_letter, (OperationalError, InterfaceError)) or es_error_transitorio(e_dead_letter):
+                    raise
+                # Que no se pueda guardar una venta fallida no debe frenar el resto del job
+                log.error(f"No se pudo guardar la venta {clave} en ventas_dead_letter, se descarta: {e_dead_letter}")
+            return 1
+        log.warning(f"Error en lote de {len(lote)} ventas, dividiendo para aislar las que fallan: {e}")
+        mitad = len(lote) // 2
+        return (insertar_lote_ventas(lote[:mitad], conexion, cursor, normalizado, base)
+                + insertar_lote_ventas(lote[mitad:], conexion, cursor, normalizado, base))
+
+
+def actualizar_resumen(lote: list[dict], conexion: Connection, cursor: Cursor):
+    """
+    Recalcula las filas de `ventas_resumen` de los (día, turno) de un lote ya commiteado, en su propia transacción.
+    El resumen es un dato derivado: si falla se loguea y el job sigue, sin afectar las ventas ya guardadas.
+    """
+    # Las ventas con una fechaHora que no se puede interpretar no tienen día: quedan fuera del resumen
+    pares = {(parse_dia(v['data'].get('fechaHora')), v['data'].get('idTurno')) for v in lote}
+    try:
+        insertar.ventas_resumen(pares, cursor)
+        conexion.commit()
+    except Exception as e:
+        conexion.rollback()
+        log.error(f"No se pudo actualizar ventas_resumen para {len(pares)} días y turnos del lote: {e}")
+
+
 def formatear_json_venta(venta):
     '''
     Formatea y prepara el JSON de una venta en tres diccionarios distintos, uno por tabla.
@@ -0,0 +1,238 @@
+import logging
+from datetime import date, datetime
+from pyodbc import Connection, Cursor
+
+try:
+    # Si está en src/
+    from api_client import api_client
+    from insertar_datos import COLUMNAS_CLAVE_DEAD_LETTER
+    from procesamiento import procesar_datos, formatear_json_descargas
+    from utils import parse_dia, parse_fecha_hora
+except ImportError or ModuleNotFoundError:
+    # Si se ejecuta desde raíz
+    from src.api_client import api_client
+    from src.insertar_datos import COLUMNAS_CLAVE_DEAD_LETTER
+    from src.procesamiento import procesar_datos, formatear_json_descargas
+    from src.utils import parse_dia, parse_fecha_hora
+
+
+log = logging.getLogger(__name__)
+
+# Tolerancia para comparar sumas de importes (floats de la API vs DECIMAL en la base)
+TOLERANCIA_IMPORTE = 0.01
+
+# Por tabla: tabla en la base, columna de fecha, columna de importe y si se puede agrupar por turno
+CONFIG_RECONCILIACION: dict[str, dict] = {
+    "ventas": {
+        "tabla": "ventas",
+        "fecha": "fechaHora",
+        "importe": "importeTotal",
+        "turno": "idTurno",
+    },
+    "descargas": {
+        "tabla": "descargas_comb",
+        "fecha": "fechaComprobante",
+        "importe": "importeCompra",
+        "turno": None,
+    },
+}
+
+Agregado = tuple[int, float, int | None]  # (cantidad, suma de importes, max numero)
+
+
+def _acumular(agregados: dict, clave: tuple, importe, numero):
+    cantidad, suma, maximo = agregados.get(clave, (0, 0.0, None))
+    numero = int(numero) if numero is not None else None
+    if numero is not None and (maximo is None or numero > maximo):
+        maximo = numero
+    agregados[clave] = (cantidad + 1, suma + float(importe or 0), maximo)
+
+
+def clave_venta(venta: dict) -> tuple:
+    """Clave de una venta de la API como se guarda en `ventas_dead_letter` (texto)."""
+    return tuple(None if venta.get(col) is None else str(venta.get(col)) for col in COLUMNAS_CLAVE_DEAD_LETTER)
+
+
+def claves_dead_letter(cursor: Cursor) -> set[tuple]:
+    """
+    Claves de las ventas que están en `ventas_dead_letter` y no llegaron a `ventas` (si después se
+    insertaron bien, ya no cuentan). Retorna un set vacío si la tabla no existe.
+    """
+    cursor.execute("SELECT OBJECT_ID('ventas_dead_letter', 'U')")
+    fila = cursor.fetchone()
+    if not fila or fila[0] is None:
+        return set()
+    cursor.execute("""
+    SELECT DISTINCT d.letra, d.tipo, d.sucursal, d.numero
+    FROM ventas_dead_letter AS d
+    WHERE NOT EXISTS (
+        SELECT 1 FROM ventas AS v
+        WHERE v.letra = d.letra AND v.tipo = d.tipo
+          AND v.sucursal = TRY_CAST(d.sucursal AS INT) AND v.numero = TRY_CAST(d.numero AS BIGINT)
+    )
+    """)
+    return {tuple(fila) for fila in cursor.fetchall()}
+
+
+def _en_ventana(fecha, ventana: tuple[datetime, datetime] | None) -> bool:
+    """Indica si una fecha de la API cae en [desde, hasta]. Sin ventana, o si la fecha no se puede interpretar, cuenta."""
+    if ventana is None:
+        return True
+    fecha_hora = parse_fecha_hora(fecha)
+    return fecha_hora is None or ventana[0] <= fecha_hora <= ventana[1]
+
+
+def agregados_api(
+    tabla: str,
+    datos: list,
+    dia: date,
+    por_turno: bool,
+    excluir: set[tuple] | None = None,
+    ventana: tuple[datetime, datetime] | None = None,
+) -> dict[tuple, Agregado]:
+    """
+    Calcula (cantidad, suma de importes, max numero) por día (y turno) a partir de la respuesta de la API.
+    Para descargas solo cuenta los items de combustible, igual que lo que se inserta en `descargas_comb`.
+    Para ventas no cuenta las que tengan su clave en `excluir` (las que están en `ventas_dead_letter`).
+    Si se pasa `ventana` (desde, hasta) solo cuenta las filas de ese rango, el mismo que usa `agregados_db`.
+    """
+    agregados: dict[tuple, Agregado] = {}
+    if tabla == "ventas":
+        for venta in datos:
+            if excluir and clave_venta(venta) in excluir:
+                continue
+            if not _en_ventana(venta.get("fechaHora"), ventana):
+                continue
+            clave = (parse_dia(venta.get("fechaHora")) or dia,)
+            if por_turno:
+                clave += (venta.get("idTurno"),)
+            _acumular(agregados, clave, venta.get("importeTotal"), venta.get("numero"))
+    else:
+        for remito in datos:
+            for item in formatear_json_descargas(remito):
+                if not _en_ventana(item.get("fechaComprobante"), ventana):
+                    continue
+                clave = (parse_dia(item.get("fechaComprobante")) or dia,)
+                _acumular(agregados, clave, item.get("importeCompra"), item.get("numero"))
+    return agregados
+
+
+def agregados_db(tabla: str, ventanas: list[tuple[datetime, datetime]], por_turno: bool, cursor: Cursor) -> dict[tuple, Agregado]:
+    """
+    Calcula los mismos agregados que `agregados_api` con una sola consulta agrupada sobre todo el rango.
+    Solo cuenta las filas dentro de alguna de las `ventanas` [desde, hasta], con los mismos límites que se le piden a la API
+    (si una ventana termina a las 23:59, las filas posteriores a 23:59:00 no se cuentan en ningún lado).
+    El filtro exterior es por rango sobre la columna de fecha para poder usar su índice.
+    """
+    config = CONFIG_RECONCILIACION[tabla]
+    fecha = config['fecha']
+    grupo = f"CAST({fecha} AS date)"
+    if por_turno:
+        grupo += f", {config['turno']}"
+    valores = ', '.join(['(?, ?)' for _ in ventanas])
+
+    query = f"""
+    SELECT {grupo}, COUNT(*), SUM({config['importe']}), MAX(numero)
+    FROM {config['tabla']}
+    WHERE {fecha} >= ? AND {fecha} <= ?
+      AND EXISTS (SELECT 1 FROM (VALUES {valores}) AS w (desde, hasta) WHERE {fecha} >= w.desde AND {fecha} <= w.hasta)
+    GROUP BY {grupo}
+    """
+    desde = min(v[0] for v in ventanas)
+    cursor.execute(query, (desde, max(v[1] for v in ventanas), *[f for ventana in ventanas for f in ventana]))
+
+    agregados: dict[tuple, Agregado] = {}
+    for fila in cursor.fetchall():
+        dia = parse_dia(fila[0]) or desde.date()
+        clave = (dia, fila[1]) if por_turno else (dia,)
+        cantidad, suma, maximo = fila[-3], fila[-2], fila[-1]
+        agregados[clave] = (int(cantidad), float(suma or 0), int(maximo) if maximo is not None else None)
+    return agregados
+
+
+def coinciden(api: Agregado | None, db: Agregado | None) -> bool:
+    """Compara dos agregados (cantidad, suma, max numero)."""
+    if api is None or db is None:
+        return api == db
+    return api[0] == db[0] and abs(api[1] - db[1]) <= TOLERANCIA_IMPORTE and api[2] == db[2]
+
+
+def reconciliar(
+    token: str,
+    tabla: str,
+    lista_fechas: list[tuple[str, str]],
+    conexion: Connection,
+    por_turno: bool = False,
+    solo_verificar: bool = False,
+    cliente=api_client,
+) -> dict:
+    """
+    Compara por día (o por día y turno) los agregados de la API contra la base y vuelve a sincronizar
+    con `procesar_datos` solo los días que no coinciden, reutilizando la respuesta ya obtenida de la API.
+
+    Las ventas que están en `ventas_dead_letter` no se cuentan del lado de la API: son diferencias conocidas
+    que se informan en `conocidas` sin resincronizar el día (volverían a fallar todas las noches).
+
+    - `lista_fechas`: lista de tuplas (fecha_desde, fecha_hasta) de un día cada una, en formato 'dd/MM/yyyy HH:mm'.
+    - `solo_verificar`: si es True solo informa las diferencias, sin escribir nada.
+    - `cliente`: cliente de la API (p. ej. `tenant.api`); por defecto el de BASE_URL y CLIENT_ID.
+
+    Retorna las diferencias y, en `pendientes`, las ventanas (fecha_desde, fecha_hasta) que difieren y no se
+    resincronizaron (con `solo_verificar`), para poder encolarlas.
+    """
+    if tabla not in CONFIG_RECONCILIACION:
+        raise ValueError(f"Tabla {tabla} no reconocida para reconciliación.")
+    if por_turno and not CONFIG_RECONCILIACION[tabla]["turno"]:
+        raise ValueError(f"La tabla {tabla} no se puede reconciliar por turno.")
+    if not lista_fechas:
+        return {"ventanas": 0, "diferencias": [], "conocidas": [], "resincronizadas": 0, "pendientes": []}
+
+    # Los dos lados se acotan a las mismas ventanas [fecha_desde, fecha_hasta] que se le piden a la API
+    ventanas = [(datetime.strptime(desde, "%d/%m/%Y %H:%M"), datetime.strptime(hasta, "%d/%m/%Y %H:%M")) for desde, hasta in lista_fechas]
+    dias = [desde.date() for desde, _ in ventanas]
+    cursor: Cursor = conexion.cursor()
+    db = agregados_db(tabla, ventanas, por_turno, cursor)
+    dead_letter = claves_dead_letter(cursor) if tabla == "ventas" else set()
+    cursor.close()
+
+    diferencias = []
+    conocidas = []
+    pendientes = []
+    resincronizadas = 0
+    for (fecha_desde, fecha_hasta), ventana, dia in zip(lista_fechas, ventanas, dias):
+        datos = cliente.get_ventas(token, fecha_desde, fecha_hasta) if tabla == "ventas" else cliente.get_compras(token, fecha_desde, fecha_hasta)
+        api = agregados_api(tabla, datos, dia, por_turno, excluir=dead_letter, ventana=ventana)
+
+        if dead_letter:
+            en_dead_letter = sum(1 for venta in datos if clave_venta(venta) in dead_letter)
+            if en_dead_letter:
+                conocidas.append({"dia": dia.isoformat(), "ventas_en_dead_letter": en_dead_letter})
+
+        claves = sorted({k for k in api if k[0] == dia} | {k for k in db if k[0] == dia}, key=str)
+        distintas = [k for k in claves if not coinciden(api.get(k), db.get(k))]
+        if not distintas:
+            continue
+
+        for clave in distintas:
+            diferencias.append({
+                "dia": clave[0].isoformat(),
+                "turno": clave[1] if por_turno else None,
+                "api": api.get(clave),
+                "db": db.get(clave),
+            })
+        log.warning(f"Reconciliación {tabla}: {fecha_desde} a {fecha_hasta} no coincide ({len(distintas)} grupos)")
+
+        if solo_verificar:
+            pendientes.append((fecha_desde, fecha_hasta))
+        else:
+            procesar_datos(token, fecha_desde, fecha_hasta, tabla, conexion, datos=datos)
+            resincronizadas += 1
+
+    log.info(f"Reconciliación {tabla}: {len(lista_fechas)} ventanas, {resincronizadas} resincronizadas")
+    return {
+        "ventanas": len(lista_fechas),
+        "diferencias": diferencias,
+        "conocidas": conocidas,
+        "resincronizadas": resincronizadas,
+        "pendientes": pendientes,
+    }
@@ -0,0 +1,112 @@
+import logging
+import os
+import threading
+import time
+from datetime import date, datetime
+from pyodbc import Connection, Cursor
+
+
+log = logging.getLogger(__name__)
+
+# Segundos que se sirve un reporte desde memoria antes de volver a consultar `ventas_resumen`
+REPORTES_CACHE_TTL = float(os.environ.get("REPORTES_CACHE_TTL", "30"))
+
+# Cantidad máxima de reportes distintos en cache
+REPORTES_CACHE_MAX = 512
+
+
+class CacheTTL:
+    """Cache en memoria con vencimiento por entrada. Al llenarse descarta primero las entradas vencidas y luego las más viejas."""
+
+    def __init__(self, ttl: float, max_entradas: int):
+        self.ttl = ttl
+        self.max_entradas = max_entradas
+        self._datos: dict = {}
+        self._lock = threading.Lock()
+
+    def obtener(self, clave):
+        """Retorna el valor si existe y no venció, si no None."""
+        with self._lock:
+            entrada = self._datos.get(clave)
+            if entrada is None:
+                return None
+            vence, valor = entrada
+            if time.monotonic() >= vence:
+                del self._datos[clave]
+                return None
+            return valor
+
+    def guardar(self, clave, valor):
+        with self._lock:
+            if len(self._datos) >= self.max_entradas:
+                ahora = time.monotonic()
+                for k in [k for k, (vence, _) in self._datos.items() if vence <= ahora]:
+                    del self._datos[k]
+                while len(self._datos) >= self.max_entradas:
+                    del self._datos[next(iter(self._datos))]
+            self._datos[clave] = (time.monotonic() + self.ttl, valor)
+
+    def limpiar(self):
+        with self._lock:
+            self._datos.clear()
+
+
+cache_reportes = CacheTTL(REPORTES_CACHE_TTL, REPORTES_CACHE_MAX)
+
+
+def parse_fecha_reporte(fecha_str: str) -> date:
+    """Convierte formato 'ddMMyyyy' a date."""
+    try:
+        return datetime.strptime(fecha_str, "%d%m%Y").date()
+    except ValueError:
+        raise ValueError(f"Formato de fecha inválido: {fecha_str}. Use formato 'ddMMyyyy'")
+
+
+def consultar_resumen(
+    conexion: Connection,
+    fecha_desde: date,
+    fecha_hasta: date,
+    idTurno: int | None = None,
+    lugarDeVentaId: int | None = None,
+    formaDePagoId: int | None = None,
+) -> dict:
+    """
+    Lee `ventas_resumen` (nunca las tablas base) para el rango de fechas y filtros dados.
+    Retorna las filas y el total del rango.
+    """
+    condiciones = ["fecha >= ?", "fecha <= ?"]
+    params: list = [fecha_desde, fecha_hasta]
+    for columna, valor in (("idTurno", idTurno), ("lugarDeVentaId", lugarDeVentaId), ("formaDePagoId", formaDePagoId)):
+        if valor is not None:
+            condiciones.append(f"{columna} = ?")
+            params.append(valor)
+
+    query = f"""
+    SELECT fecha, idTurno, lugarDeVentaId, formaDePagoId, cantidad, importeTotal
+    FROM ventas_resumen
+    WHERE {' AND '.join(condiciones)}
+    ORDER BY fecha, idTurno, lugarDeVentaId, formaDePagoId
+    """
+    cursor: Cursor = conexion.cursor()
+    cursor.execute(query, tuple(params))
+    filas = [
+        {
+            "fecha": fila[0].isoformat() if isinstance(fila[0], date) else fila[0],
+            "idTurno": fila[1],
+            # -1 es como se guardan las claves nulas en el resumen
+            "lugarDeVentaId": None if fila[2] == -1 else fila[2],
+            "formaDePagoId": None if fila[3] == -1 else fila[3],
+            "cantidad": fila[4],
+            "importeTotal": float(fila[5] or 0),
+        }
+        for fila in cursor.fetchall()
+    ]
+    cursor.close()
+
+    return {
+        "filas": filas,
+        "total": {
+            "cantidad": sum(f["cantidad"] for f in filas),
+            "importeTotal": round(sum(f["importeTotal"] for f in filas), 4),
+        },
+    }
@@ -0,0 +1,110 @@
+import json
+import logging
+import os
+import threading
+import time
+from dotenv import load_dotenv
+
+try:
+    # Si está en src/
+    from api_client import ClienteDebo
+    from connection import PoolConexiones
+    from procesamiento import procesar_datos
+except ImportError or ModuleNotFoundError:
+    # Si se ejecuta desde raíz
+    from src.api_client import ClienteDebo
+    from src.connection import PoolConexiones
+    from src.procesamiento import procesar_datos
+
+
+load_dotenv()
+log = logging.getLogger(__name__)
+
+# Pausa entre días de descargas, igual que en /jobs/descargas
+PAUSA_DESCARGAS = 2
+
+
+class Tenant:
+    """
+    Un cliente de DEBO con su propia base de datos.
+    Tiene su propia sesión HTTP y cache de token (`api`) y su propio pool de conexiones (`pool`).
+    """
+
+    def __init__(self, id: str, config: dict):
+        self.id = id
+        self.api = ClienteDebo(config.get("base_url"), config.get("client_id"))
+        self.pool = PoolConexiones(config, tamanio=int(config.get("pool", 2)))
+        self.max_concurrencia = int(config.get("max_concurrencia", self.pool.tamanio))
+
+
+def _resolver(valor):
+    """Permite referenciar secretos como "env:NOMBRE_VARIABLE" en lugar de escribirlos en el archivo."""
+    if isinstance(valor, str) and valor.startswith("env:"):
+        return os.environ.get(valor[4:])
+    return valor
+
+
+def _leer_configuracion() -> dict[str, dict]:
+    """
+    Lee los tenants desde el archivo JSON en `TENANTS_FILE` o el JSON en la variable `TENANTS`.
+    Acepta una lista de objetos con `id` o un objeto {id: config}.
+    Si no hay ninguno configurado, arma un único tenant `default` con las variables de entorno de siempre.
+    """
+    ruta = os.environ.get("TENANTS_FILE")
+    if ruta:
+        with open(ruta, encoding="utf-8") as archivo:
+            crudo = json.load(archivo)
+    elif os.environ.get("TENANTS"):
+        crudo = json.loads(os.environ["TENANTS"])
+    else:
+        crudo = {
+            "default": {
+                "base_url": os.environ.get("BASE_URL"),
+                "client_id": os.environ.get("CLIENT_ID"),
+                "sql_server": os.environ.get("SQL_SERVER"),
+                "sql_database": os.environ.get("SQL_DATABASE"),
+                "sql_user": os.environ.get("SQL_USER"),
+                "sql_password": os.environ.get("SQL_PASSWORD"),
+            }
+        }
+
+    if isinstance(crudo, list):
+        crudo = {t["id"]: t for t in crudo}
+    return {str(id): {k: _resolver(v) for k, v in config.items()} for id, config in crudo.items()}
+
+
+_registro: dict[str, Tenant] | None = None
+_lock = threading.Lock()
+
+
+def get_tenants() -> dict[str, Tenant]:
+    """Retorna el registro de tenants, cargándolo la primera vez."""
+    global _registro
+    with _lock:
+        if _registro is None:
+            _registro = {id: Tenant(id, config) for id, config in _leer_configuracion().items()}
+            log.info(f"Tenants cargados: {list(_registro)}")
+        return _registro
+
+
+def get_tenant(tenant_id: str) -> Tenant | None:
+    return get_tenants().get(tenant_id)
+
+
+def tarea_ventana(tenant: Tenant, tabla: str, fecha_desde: str, fecha_hasta: str, cancelado: threading.Event | None = None):
+    """
+    Arma la tarea que sincroniza una ventana de `ventas` o `descargas` de un tenant.
+    La consulta a la API se hace antes de tomar una conexión del pool para no retenerla durante la descarga.
+    `cancelado` se pasa a `procesar_datos`, que deja de escribir si se setea.
+    """
+    def ejecutar():
+        token = tenant.api.token()
+        if tabla == "ventas":
+            datos = tenant.api.get_ventas(token, fecha_desde, fecha_hasta)
+        else:
+            datos = tenant.api.get_compras(token, fecha_desde, fecha_hasta)
+        with tenant.pool.conexion() as conexion:
+            procesar_datos(token, fecha_desde, fecha_hasta, tabla, conexion, datos=datos, cancelado=cancelado)
+        if tabla == "descargas":
+            time.sleep(PAUSA_DESCARGAS)
+    return ejecutar
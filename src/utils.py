@@ -1,4 +1,4 @@
-from datetime import datetime, timedelta
+from datetime import date, datetime, timedelta
 from pyodbc import Cursor 
 import logging
 from typing import TypeAlias
@@ -121,4 +121,49 @@ def get_fechas_procesadas_descargas(
 
         lista_fechas.append((fecha_inicio, fecha_fin))
                                           
-    return lista_fechas
\ No newline at end of file
+    return lista_fechas
+
+def dividir_por_dia(fecha_desde: Dia, fecha_hasta: Dia) -> list[tuple[Dia, Dia]]:
+    """
+    Divide una ventana (fecha_desde, fecha_hasta) en formato 'dd/MM/yyyy HH:mm' en ventanas que no cruzan
+    la medianoche, para poder repartir un rango largo entre varios workers.
+    Si la ventana dura un día o menos (p. ej. un turno) se devuelve sin dividir.
+    """
+    desde = datetime.strptime(fecha_desde, "%d/%m/%Y %H:%M")
+    hasta = datetime.strptime(fecha_hasta, "%d/%m/%Y %H:%M")
+    if hasta - desde <= timedelta(days=1):
+        return [(fecha_desde, fecha_hasta)]
+    ventanas = []
+    while desde < hasta:
+        fin = min(hasta, (desde + timedelta(days=1)).replace(hour=0, minute=0))
+        ventanas.append((desde.strftime("%d/%m/%Y %H:%M"), fin.strftime("%d/%m/%Y %H:%M")))
+        desde = fin
+    return ventanas or [(fecha_desde, fecha_hasta)]
+
+
+def parse_fecha_hora(fecha) -> datetime | None:
+    """
+    Interpreta una fecha de la API: `datetime`, ISO ('2025-10-02T10:00:00') o 'dd/MM/yyyy HH:mm[:ss]'.
+    Retorna None si no se puede interpretar.
+    """
+    if isinstance(fecha, datetime):
+        return fecha
+    if isinstance(fecha, date):
+        return datetime.combine(fecha, datetime.min.time())
+    if isinstance(fecha, str):
+        try:
+            return datetime.fromisoformat(fecha.replace("Z", ""))
+        except ValueError:
+            pass
+        for formato in ("%d/%m/%Y %H:%M:%S", "%d/%m/%Y %H:%M", "%d/%m/%Y"):
+            try:
+                return datetime.strptime(fecha, formato)
+            except ValueError:
+                pass
+    return None
+
+
+def parse_dia(fecha) -> date | None:
+    """Día de una fecha de la API (ver `parse_fecha_hora`). Retorna None si no se puede interpretar."""
+    fecha_hora = parse_fecha_hora(fecha)
+    return fecha_hora.date() if fecha_hora else None
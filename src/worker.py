@@ -0,0 +1,143 @@
+"""
+Worker independiente que procesa las ventanas encoladas en `trabajos_cola`.
+
+    python -m src.worker
+
+Se pueden levantar varios (en distintos contenedores o hosts) contra la misma base:
+cada ventana la toma un solo worker gracias a los leases de `ColaSQL`.
+"""
+import logging
+import os
+import signal
+import socket
+import threading
+import time
+from typing import Callable
+
+try:
+    # Si está en src/
+    from cola import ColaSQL
+    from tenants import get_tenant, tarea_ventana
+except ImportError or ModuleNotFoundError:
+    # Si se ejecuta desde raíz
+    from src.cola import ColaSQL
+    from src.tenants import get_tenant, tarea_ventana
+
+
+log = logging.getLogger(__name__)
+
+# Duración del lease; el heartbeat lo renueva cada un tercio de este tiempo
+LEASE_SEGUNDOS = int(os.environ.get("WORKER_LEASE_SEGUNDOS", "120"))
+# Espera entre consultas a la cola cuando no hay trabajo
+ESPERA_SEGUNDOS = float(os.environ.get("WORKER_ESPERA_SEGUNDOS", "5"))
+
+
+def _heartbeat(cola, id: int, worker: str, lease_segundos: int, terminado: threading.Event, perdido: threading.Event):
+    """
+    Renueva el lease de la ventana hasta que termine de procesarse. Si lo pierde (otro worker la reclamó,
+    o no se pudo renovar antes de que venciera) setea `perdido` para que se deje de procesar.
+    """
+    ultima_renovacion = time.monotonic()
+    while not terminado.wait(lease_segundos / 3):
+        try:
+            if cola.renovar(id, worker, lease_segundos):
+                ultima_renovacion = time.monotonic()
+                continue
+            log.warning(f"Worker {worker} perdió el lease de la ventana {id}, se cancela su procesamiento")
+            perdido.set()
+            return
+        except Exception as e:
+            log.warning(f"Error renovando lease de la ventana {id}: {e}")
+            if time.monotonic() - ultima_renovacion >= lease_segundos:
+                log.warning(f"El lease de la ventana {id} venció sin poder renovarse, se cancela su procesamiento")
+                perdido.set()
+                return
+
+
+def ejecutar_worker(
+    cola,
+    procesar: Callable[[dict, threading.Event], None],
+    worker: str,
+    detener: threading.Event,
+    lease_segundos: int = LEASE_SEGUNDOS,
+    espera_segundos: float = ESPERA_SEGUNDOS,
+):
+    """
+    Loop de un worker: reclama una ventana, la procesa con `procesar` manteniendo el lease con heartbeats
+    y la marca como completada o fallida. Termina cuando se setea `detener` (después de la ventana en curso).
+    `cola` es cualquier objeto con la interfaz de `ColaSQL` (reclamar, renovar, completar, fallar).
+
+    `procesar(item, perdido)` recibe un Event que se setea si se pierde el lease: debe revisarlo entre
+    lotes y dejar de escribir. Una ventana cuyo lease se perdió no se marca como completada ni fallida,
+    porque ya es de otro worker.
+    """
+    while not detener.is_set():
+        try:
+            item = cola.reclamar(worker, lease_segundos)
+        except Exception as e:
+            log.error(f"Error reclamando trabajo de la cola: {e}")
+            detener.wait(espera_segundos)
+            continue
+        if item is None:
+            detener.wait(espera_segundos)
+            continue
+
+        terminado = threading.Event()
+        perdido = threading.Event()
+        latido = threading.Thread(target=_heartbeat, args=(cola, item["id"], worker, lease_segundos, terminado, perdido), daemon=True)
+        latido.start()
+        try:
+            procesar(item, perdido)
+            if perdido.is_set():
+                log.warning(f"Ventana {item['id']} terminada después de perder el lease: no se marca como completada")
+            else:
+                cola.completar(item["id"], worker)
+        except Exception as e:
+            if perdido.is_set():
+                log.warning(f"Ventana {item['id']} cancelada por pérdida del lease: {e}")
+            else:
+                log.error(f"Error procesando ventana {item['id']} ({item.get('tabla')} {item.get('fecha_desde')} a {item.get('fecha_hasta')}): {e}")
+                cola.fallar(item["id"], worker, str(e))
+        finally:
+            terminado.set()
+            latido.join()
+
+
+def procesar_item(item: dict, cancelado: threading.Event | None = None):
+    """Sincroniza una ventana de `trabajos_cola` con el tenant correspondiente. Deja de escribir si se setea `cancelado`."""
+    tenant = get_tenant(item["tenant"])
+    if tenant is None:
+        raise ValueError(f"Tenant {item['tenant']} no configurado en este worker")
+    log.info(f"Procesando {item['tabla']} del tenant {tenant.id} de {item['fecha_desde']} a {item['fecha_hasta']} (job {item['job_id']})")
+    tarea_ventana(tenant, item["tabla"], item["fecha_desde"], item["fecha_hasta"], cancelado)()
+
+
+def main():
+    logging.basicConfig(level=logging.INFO)
+    hilos = int(os.environ.get("WORKER_HILOS", "1"))
+    nombre = os.environ.get("WORKER_NOMBRE", f"{socket.gethostname()}-{os.getpid()}")
+
+    cola = ColaSQL(tamanio_pool=hilos * 2)
+    cola.preparar()
+
+    detener = threading.Event()
+    def al_recibir_senial(signum, frame):
+        log.info("Señal recibida, terminando después de las ventanas en curso...")
+        detener.set()
+    signal.signal(signal.SIGTERM, al_recibir_senial)
+    signal.signal(signal.SIGINT, al_recibir_senial)
+
+    log.info(f"Worker {nombre} iniciado con {hilos} hilos")
+    workers = [
+        threading.Thread(target=ejecutar_worker, args=(cola, procesar_item, f"{nombre}-{i}", detener), name=f"worker-{i}")
+        for i in range(hilos)
+    ]
+    for w in workers:
+        w.start()
+    for w in workers:
+        w.join()
+    log.info(f"Worker {nombre} detenido")
+
+
+if __name__ == "__main__":
+    main()